@@ -0,0 +1,57 @@
+"""composite and partial indexes for per-user queries
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-18
+
+Índices para las consultas por usuario de los routers (listados, dashboard,
+presupuestos, recurrentes). Se crean con CREATE INDEX CONCURRENTLY para no
+bloquear escrituras en tablas grandes durante el deploy; por eso corren fuera
+de la transacción de la migración (autocommit_block).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "010"
+down_revision = "009"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    # Listado de transacciones y keyset pagination: ORDER BY date DESC, created_at DESC, id DESC
+    ("ix_transactions_user_date", "transactions",
+     ["user_id", sa.text("date DESC"), sa.text("created_at DESC"), sa.text("id DESC")], {}),
+    # Gasto por categoría y mes (presupuestos)
+    ("ix_transactions_user_category_date", "transactions", ["user_id", "category_id", "date"], {}),
+    # Filtro por cuenta y FK de accounts
+    ("ix_transactions_account_date", "transactions", ["account_id", "date"], {}),
+    # Sumas del mes del dashboard y estadísticas: solo movimientos que no son transferencias
+    ("ix_transactions_user_type_date_no_transfer", "transactions", ["user_id", "type", "date"],
+     {"postgresql_where": sa.text("transfer_pair_id IS NULL")}),
+    ("ix_recurring_expenses_user_active_next", "recurring_expenses", ["user_id", "is_active", "next_date"], {}),
+    ("ix_accounts_user_id", "accounts", ["user_id"], {}),
+    ("ix_categories_user_id", "categories", ["user_id"], {}),
+    ("ix_debts_user_date", "debts", ["user_id", "date"], {}),
+    ("ix_budgets_user_year_month", "budgets", ["user_id", "year", "month"], {}),
+    ("ix_savings_goals_user_created", "savings_goals", ["user_id", "created_at"], {}),
+    # FKs hijas que se cargan por relación (pagos y aportes)
+    ("ix_debt_payments_debt_id", "debt_payments", ["debt_id"], {}),
+    ("ix_recurring_payments_recurring_expense_id", "recurring_payments", ["recurring_expense_id"], {}),
+    ("ix_goal_contributions_goal_id", "goal_contributions", ["goal_id"], {}),
+]
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, kwargs in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_concurrently=True, if_not_exists=True, **kwargs,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _columns, _kwargs in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,48 @@
+"""email outbox
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-18
+
+Cola transaccional de emails: la fila se escribe en la misma transacción que el
+token y un worker en segundo plano la entrega con reintentos.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "011"
+down_revision = "010"
+branch_labels = None
+depends_on = None
+
+email_kind = sa.Enum("verification", "password_reset", name="emailkind")
+outbox_status = sa.Enum("pending", "sent", "failed", name="outboxstatus")
+
+
+def upgrade():
+    op.create_table(
+        "email_outbox",
+        sa.Column("id", sa.Integer, primary_key=True, index=True),
+        sa.Column("kind", email_kind, nullable=False),
+        sa.Column("to_email", sa.String, nullable=False),
+        sa.Column("token", sa.String, nullable=False),
+        sa.Column("status", outbox_status, nullable=False, server_default="pending"),
+        sa.Column("attempts", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("next_attempt_at", sa.DateTime, nullable=False, server_default=sa.func.now()),
+        sa.Column("last_error", sa.String, nullable=True),
+        sa.Column("created_at", sa.DateTime, nullable=False, server_default=sa.func.now()),
+        sa.Column("sent_at", sa.DateTime, nullable=True),
+    )
+    op.create_index(
+        "ix_email_outbox_pending_next_attempt",
+        "email_outbox",
+        ["next_attempt_at"],
+        postgresql_where=sa.text("status = 'pending'"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_email_outbox_pending_next_attempt", table_name="email_outbox")
+    op.drop_table("email_outbox")
+    outbox_status.drop(op.get_bind(), checkfirst=True)
+    email_kind.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,38 @@
+"""recurring payment occurrences
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-18
+
+Agrega occurrence_date a recurring_payments con unicidad por recurrente, para que
+cada ocurrencia se cobre una sola vez (pago manual o motor de recurrentes), y un
+índice parcial para el barrido de recurrentes activos vencidos.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "012"
+down_revision = "011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("recurring_payments", sa.Column("occurrence_date", sa.Date, nullable=True))
+    op.create_unique_constraint(
+        "uq_recurring_payments_occurrence",
+        "recurring_payments",
+        ["recurring_expense_id", "occurrence_date"],
+    )
+    op.create_index(
+        "ix_recurring_expenses_due",
+        "recurring_expenses",
+        ["next_date"],
+        postgresql_where=sa.text("is_active"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_recurring_expenses_due", table_name="recurring_expenses")
+    op.drop_constraint("uq_recurring_payments_occurrence", "recurring_payments", type_="unique")
+    op.drop_column("recurring_payments", "occurrence_date")
@@ -0,0 +1,57 @@
+"""monthly rollups
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-18
+
+Tabla monthly_rollups con totales mensuales por usuario, categoría, cuenta, tipo y
+si es transferencia. Se llena con los datos existentes; desde aquí la mantienen los
+routers con deltas en la misma transacción que escribe en transactions.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "013"
+down_revision = "012"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "monthly_rollups",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("year", sa.Integer, nullable=False),
+        sa.Column("month", sa.Integer, nullable=False),
+        sa.Column("category_id", sa.Integer, nullable=True),
+        sa.Column("account_id", sa.Integer, nullable=False),
+        sa.Column("type", postgresql.ENUM(name="transactiontype", create_type=False), nullable=False),
+        sa.Column("is_transfer", sa.Boolean, nullable=False),
+        sa.Column("total", sa.Float, nullable=False, server_default="0"),
+        sa.Column("count", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime, nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index(
+        "uq_monthly_rollups_key",
+        "monthly_rollups",
+        ["user_id", "year", "month", sa.text("COALESCE(category_id, 0)"), "account_id", "type", "is_transfer"],
+        unique=True,
+    )
+    op.create_index("ix_monthly_rollups_updated_at", "monthly_rollups", ["updated_at"])
+    op.execute("""
+        INSERT INTO monthly_rollups
+            (user_id, year, month, category_id, account_id, type, is_transfer, total, count, updated_at)
+        SELECT user_id, EXTRACT(YEAR FROM date), EXTRACT(MONTH FROM date), category_id, account_id, type,
+               transfer_pair_id IS NOT NULL, SUM(amount), COUNT(*), now() AT TIME ZONE 'utc'
+        FROM transactions
+        GROUP BY user_id, EXTRACT(YEAR FROM date), EXTRACT(MONTH FROM date), category_id, account_id, type,
+                 transfer_pair_id IS NOT NULL
+    """)
+
+
+def downgrade():
+    op.drop_index("ix_monthly_rollups_updated_at", table_name="monthly_rollups")
+    op.drop_index("uq_monthly_rollups_key", table_name="monthly_rollups")
+    op.drop_table("monthly_rollups")
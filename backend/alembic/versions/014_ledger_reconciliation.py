@@ -0,0 +1,50 @@
+"""ledger reconciliation
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-18
+
+Agrega accounts.opening_balance (saldo que no explican las transacciones) y la tabla
+ledger_checkpoints para conciliaciones incrementales. opening_balance se calcula para
+las cuentas existentes asumiendo que su saldo actual es correcto.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "014"
+down_revision = "013"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "accounts",
+        sa.Column("opening_balance", sa.Float, nullable=False, server_default="0"),
+    )
+    op.execute("UPDATE accounts SET opening_balance = balance")
+    # Débito: ingresos suman, gastos restan. Crédito (deuda): al revés.
+    op.execute("""
+        UPDATE accounts a
+        SET opening_balance = a.balance - e.effect
+        FROM (
+            SELECT t.account_id,
+                   SUM(CASE WHEN (acc.type = 'debit') = (t.type = 'income') THEN t.amount ELSE -t.amount END) AS effect
+            FROM transactions t
+            JOIN accounts acc ON acc.id = t.account_id
+            GROUP BY t.account_id
+        ) e
+        WHERE e.account_id = a.id
+    """)
+    op.create_table(
+        "ledger_checkpoints",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("verified_at", sa.DateTime, nullable=False),
+        sa.Column("accounts_checked", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("drifted_accounts", sa.Integer, nullable=False, server_default="0"),
+    )
+
+
+def downgrade():
+    op.drop_table("ledger_checkpoints")
+    op.drop_column("accounts", "opening_balance")
@@ -0,0 +1,47 @@
+"""goal progress
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-18
+
+Agrega savings_goals.current_amount y contribution_count (mantenidos en cada aporte) y
+los calcula para las metas existentes. El índice (goal_id, date, id) de aportes sirve la
+paginación del historial y reemplaza al de goal_id solo.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "015"
+down_revision = "014"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "savings_goals",
+        sa.Column("current_amount", sa.Float, nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "savings_goals",
+        sa.Column("contribution_count", sa.Integer, nullable=False, server_default="0"),
+    )
+    op.execute("""
+        UPDATE savings_goals sg
+        SET current_amount = c.total, contribution_count = c.n
+        FROM (
+            SELECT goal_id, SUM(amount) AS total, COUNT(*) AS n
+            FROM goal_contributions
+            GROUP BY goal_id
+        ) c
+        WHERE c.goal_id = sg.id
+    """)
+    op.create_index("ix_goal_contributions_goal_date", "goal_contributions", ["goal_id", "date", "id"])
+    op.drop_index("ix_goal_contributions_goal_id", table_name="goal_contributions", if_exists=True)
+
+
+def downgrade():
+    op.create_index("ix_goal_contributions_goal_id", "goal_contributions", ["goal_id"])
+    op.drop_index("ix_goal_contributions_goal_date", table_name="goal_contributions")
+    op.drop_column("savings_goals", "contribution_count")
+    op.drop_column("savings_goals", "current_amount")
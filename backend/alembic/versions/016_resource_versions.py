@@ -0,0 +1,30 @@
+"""resource versions
+
+Revision ID: 016
+Revises: 015
+Create Date: 2026-10-18
+
+Tabla resource_versions: un contador por usuario y recurso (accounts, categories,
+recurring, debts, goals) que cada escritura incrementa. Los listados lo usan como ETag.
+Arranca vacía: sin fila la versión es 0.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "016"
+down_revision = "015"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "resource_versions",
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("resource", sa.String, primary_key=True),
+        sa.Column("version", sa.BigInteger, nullable=False, server_default="0"),
+    )
+
+
+def downgrade():
+    op.drop_table("resource_versions")
@@ -3,13 +3,70 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     database_url: str
+    # Opcional: URL para el engine async; por defecto se deriva de database_url
+    async_database_url: str = ""
+    # Pool de conexiones (aplica a los engines sync y async, cada uno con su propio pool)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800  # segundos; evita conexiones muertas tras periodos inactivos
+    db_pool_pre_ping: bool = True
+    # PgBouncer en modo transacción: sin prepared statements reutilizables
+    db_pgbouncer: bool = False
+    # Reintentos de una escritura abortada por serialización o deadlock
+    db_write_retries: int = 3
+    # /internal/* exige el header X-Internal-Token con este valor; vacío: /internal/* responde 404
+    internal_stats_token: str = ""
     secret_key: str
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 10080  # 7 days
     cors_origins: str = "http://localhost:3000,http://localhost:5173"
     resend_api_key: str = ""
+    # Transporte de emails: "resend", "console" o "file" (vacío: resend si hay API key)
+    email_transport: str = ""
+    email_file_path: str = "emails.jsonl"
     frontend_url: str = "http://localhost:3000"
     google_client_id: str = ""
+    # Hash de contraseñas: costo de bcrypt y pool de procesos dedicado
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_max_pending: int = 8
+    # Cache en proceso del principal autenticado (jti → usuario) y de claims decodificados
+    auth_cache_ttl_seconds: int = 60
+    auth_claims_cache_ttl_seconds: int = 30
+    auth_cache_max_entries: int = 4096
+    # Cache en proceso del resumen del dashboard (se invalida en cada escritura del usuario)
+    dashboard_cache_ttl_seconds: int = 60
+    dashboard_cache_max_users: int = 1024
+    # Cache en proceso de cuentas y categorías por usuario (listados y validaciones de pertenencia)
+    reference_cache_ttl_seconds: int = 300
+    reference_cache_max_entries: int = 4096
+    # Auditoría: escritura en lotes desde un hilo de fondo
+    audit_batch_size: int = 200
+    audit_flush_interval_seconds: float = 1.0
+    audit_queue_max_size: int = 10000
+    # Outbox de emails: worker en segundo plano con reintentos y backoff exponencial
+    email_outbox_worker_enabled: bool = True
+    email_outbox_poll_seconds: float = 5.0
+    email_outbox_batch_size: int = 20
+    email_outbox_max_attempts: int = 8
+    email_outbox_backoff_seconds: float = 30.0
+    # Motor de recurrentes: shards de usuarios en paralelo y tope de ocurrencias por corrida
+    recurring_engine_shards: int = 4
+    recurring_max_catchup: int = 366
+    # Importación masiva de transacciones (CSV/OFX)
+    import_max_rows: int = 100000
+    # Tablas de amortización de deudas: horizonte máximo (meses) y cache por usuario
+    amortization_max_periods: int = 360
+    debt_schedule_cache_ttl_seconds: int = 3600
+    debt_schedule_cache_max_users: int = 1024
+    # Conciliación de saldos: shards de usuarios repartidos en un pool de procesos
+    reconciliation_shards: int = 16
+    reconciliation_workers: int = 4
+    # Margen restado al checkpoint incremental (transacciones que pg_stat_activity no muestra)
+    reconciliation_watermark_margin_seconds: int = 300
+    # Respuestas: compresión brotli/gzip desde este tamaño (bytes)
+    compression_min_bytes: int = 1024
 
     @property
     def cors_origins_list(self) -> list[str]:
@@ -1,11 +1,153 @@
-from sqlalchemy import create_engine
+import threading
+import time
+import uuid
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from app.config import settings
 
-engine = create_engine(settings.database_url)
+
+class PoolStats:
+    """Contadores de un pool de conexiones (checkouts, esperas, invalidaciones)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+
+    def incr(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def record_wait(self, seconds: float, timed_out: bool) -> None:
+        with self._lock:
+            self.waits += 1
+            self.wait_time += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self, pool: QueuePool) -> dict:
+        with self._lock:
+            return {
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "invalidations": self.invalidations,
+                "waits": self.waits,
+                "wait_time_ms": round(self.wait_time * 1000, 2),
+                "max_wait_ms": round(self.max_wait * 1000, 2),
+                "timeouts": self.timeouts,
+            }
+
+
+class _InstrumentedPoolMixin:
+    """Mide cuánto espera un checkout cuando el pool está agotado (sin conexiones libres ni overflow)."""
+
+    stats: PoolStats
+
+    def _do_get(self):
+        saturated = self.checkedin() == 0 and -1 < self._max_overflow <= self._overflow
+        if not saturated:
+            return super()._do_get()
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.stats.record_wait(time.perf_counter() - started, timed_out)
+
+
+def _instrumented(pool_class: type[QueuePool], stats: PoolStats) -> type[QueuePool]:
+    # Atributo de clase: sobrevive a pool.recreate() (engine.dispose())
+    return type(f"Instrumented{pool_class.__name__}", (_InstrumentedPoolMixin, pool_class), {"stats": stats})
+
+
+def _listen_pool_events(engine: Engine, stats: PoolStats) -> None:
+    event.listen(engine, "connect", lambda *args: stats.incr("connects"))
+    event.listen(engine, "checkout", lambda *args: stats.incr("checkouts"))
+    event.listen(engine, "checkin", lambda *args: stats.incr("checkins"))
+    event.listen(engine, "invalidate", lambda *args: stats.incr("invalidations"))
+    event.listen(engine, "soft_invalidate", lambda *args: stats.incr("invalidations"))
+
+
+def _pool_options() -> dict:
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def _async_url(database_url: str) -> tuple[URL, dict]:
+    """Traduce DATABASE_URL (psycopg2) a asyncpg.
+
+    asyncpg no entiende `sslmode`/`channel_binding` en la query string (Neon los usa);
+    sslmode se pasa como el argumento `ssl` del driver. Detrás de PgBouncer en modo
+    transacción no se pueden reutilizar prepared statements entre transacciones, así
+    que se desactiva su cache y se les da nombres únicos.
+    """
+    url = make_url(database_url)
+    query = dict(url.query)
+    connect_args = {}
+    sslmode = query.pop("sslmode", None)
+    query.pop("channel_binding", None)
+    if sslmode:
+        connect_args["ssl"] = sslmode
+    if settings.db_pgbouncer:
+        query["prepared_statement_cache_size"] = "0"
+        connect_args["statement_cache_size"] = 0
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+    return url.set(drivername="postgresql+asyncpg", query=query), connect_args
+
+
+sync_pool_stats = PoolStats()
+engine = create_engine(
+    settings.database_url,
+    poolclass=_instrumented(QueuePool, sync_pool_stats),
+    **_pool_options(),
+)
+_listen_pool_events(engine, sync_pool_stats)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_pool_stats = PoolStats()
+_url, _connect_args = _async_url(settings.async_database_url or settings.database_url)
+async_engine = create_async_engine(
+    _url,
+    connect_args=_connect_args,
+    poolclass=_instrumented(AsyncAdaptedQueuePool, async_pool_stats),
+    **_pool_options(),
+)
+_listen_pool_events(async_engine.sync_engine, async_pool_stats)
+# expire_on_commit=False: en async no hay lazy loads implícitos tras el commit
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+def pool_stats() -> dict:
+    return {
+        "sync": sync_pool_stats.snapshot(engine.pool),
+        "async": async_pool_stats.snapshot(async_engine.sync_engine.pool),
+    }
+
 
 class Base(DeclarativeBase):
     pass
@@ -1,14 +1,27 @@
+import time
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
 
-from app.database import SessionLocal
+from app.config import settings
+from app.database import AsyncSessionLocal, SessionLocal
 from app.utils.auth import decode_token
+from app.utils.cache import TTLCache
 from app.models.user import User
 from app.models.revoked_token import RevokedToken
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# token → claims ya verificados (firma); la expiración se revisa en cada uso
+claims_cache = TTLCache(settings.auth_cache_max_entries, settings.auth_claims_cache_ttl_seconds)
+# jti → user_id de tokens que ya pasaron el chequeo de revocación
+principal_cache = TTLCache(settings.auth_cache_max_entries, settings.auth_cache_ttl_seconds)
+# user_id → copia desacoplada del usuario, se adjunta a la sesión con merge(load=False)
+user_cache = TTLCache(settings.auth_cache_max_entries, settings.auth_cache_ttl_seconds)
+
 
 def get_db():
     db = SessionLocal()
@@ -18,27 +31,104 @@ def get_db():
         db.close()
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> User:
-    credentials_exception = HTTPException(
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def invalidate_token(token: str, jti: str | None) -> None:
+    """Llamar al revocar un token para que deje de autenticar de inmediato en este proceso."""
+    claims_cache.invalidate(token)
+    if jti:
+        principal_cache.invalidate(jti)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Llamar tras modificar un usuario para que la próxima request lo lea de la DB."""
+    user_cache.invalidate(user_id)
+
+
+def _decode_claims(token: str) -> dict | None:
+    claims = claims_cache.get(token)
+    if claims is None:
+        claims = decode_token(token)
+        if claims is None:
+            return None
+        claims_cache.set(token, claims)
+    if claims.get("exp", 0) <= time.time():
+        return None
+    return claims
+
+
+def _detached_copy(user: User) -> User:
+    copy = User(**{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudo validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    payload = decode_token(token)
-    if payload is None:
-        raise credentials_exception
 
-    jti = payload.get("jti")
-    if jti and db.query(RevokedToken).filter(RevokedToken.jti == jti).first():
-        raise credentials_exception
 
+def _principal_claims(token: str) -> tuple[int, str | None]:
+    payload = _decode_claims(token)
+    if payload is None:
+        raise _credentials_exception()
     user_id_str: str = payload.get("sub")
     if user_id_str is None:
-        raise credentials_exception
-    user = db.query(User).filter(User.id == int(user_id_str)).first()
+        raise _credentials_exception()
+    return int(user_id_str), payload.get("jti")
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+) -> User:
+    user_id, jti = _principal_claims(token)
+
+    if jti and principal_cache.get(jti) != user_id:
+        epoch = principal_cache.epoch
+        if db.query(RevokedToken).filter(RevokedToken.jti == jti).first():
+            raise _credentials_exception()
+        principal_cache.set(jti, user_id, epoch=epoch)
+
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        # Sin SQL: la copia cacheada queda como instancia persistente de esta sesión
+        return db.merge(cached, load=False)
+
+    epoch = user_cache.epoch
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None:
+        raise _credentials_exception()
+    user_cache.set(user_id, _detached_copy(user), epoch=epoch)
+    return user
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    """Igual que get_current_user, sobre la sesión async (routers `async def`)."""
+    user_id, jti = _principal_claims(token)
+
+    if jti and principal_cache.get(jti) != user_id:
+        epoch = principal_cache.epoch
+        if await db.scalar(select(RevokedToken.id).where(RevokedToken.jti == jti)):
+            raise _credentials_exception()
+        principal_cache.set(jti, user_id, epoch=epoch)
+
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return await db.merge(cached, load=False)
+
+    epoch = user_cache.epoch
+    user = await db.get(User, user_id)
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    user_cache.set(user_id, _detached_copy(user), epoch=epoch)
     return user
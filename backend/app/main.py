@@ -1,7 +1,8 @@
 from contextlib import asynccontextmanager
 from datetime import datetime
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
@@ -11,7 +12,11 @@ from app.config import settings
 from app.database import SessionLocal
 from app.limiter import limiter
 from app.models.revoked_token import RevokedToken
-from app.routers import auth, accounts, categories, transactions, budgets, recurring, debts, dashboard, savings_goals
+from app.utils.audit import shutdown_audit_writer
+from app.utils.auth import PasswordHasherBusy, shutdown_password_pool
+from app.utils.outbox import start_outbox_worker, stop_outbox_worker
+from app.utils.serialization import CompressionMiddleware, FastJSONResponse
+from app.routers import auth, accounts, categories, transactions, budgets, recurring, debts, dashboard, savings_goals, stats, forecast, internal
 
 
 @asynccontextmanager
@@ -24,13 +29,28 @@ async def lifespan(app: FastAPI):
         pass
     finally:
         db.close()
+    start_outbox_worker()
     yield
+    stop_outbox_worker()
+    shutdown_audit_writer()
+    shutdown_password_pool()
 
 
-app = FastAPI(title="FinZen API", version="1.0.0", lifespan=lifespan)
+def _password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Servidor ocupado, intenta de nuevo en unos segundos"},
+        headers={"Retry-After": "1"},
+    )
+
+
+app = FastAPI(title="FinZen API", version="1.0.0", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+app.add_exception_handler(PasswordHasherBusy, _password_hasher_busy_handler)
+# Primero (más adentro): SlowAPIMiddleware convierte las respuestas en streaming
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_bytes)
 app.add_middleware(SlowAPIMiddleware)
 
 app.add_middleware(
@@ -39,6 +59,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 app.include_router(auth.router)
@@ -50,6 +71,9 @@ app.include_router(recurring.router)
 app.include_router(debts.router)
 app.include_router(savings_goals.router)
 app.include_router(dashboard.router)
+app.include_router(stats.router)
+app.include_router(forecast.router)
+app.include_router(internal.router)
 
 
 @app.get("/")
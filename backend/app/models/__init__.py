@@ -5,5 +5,10 @@ from app.models.transaction import Transaction
 from app.models.budget import Budget
 from app.models.recurring import RecurringExpense, RecurringPayment
 from app.models.debt import Debt, DebtPayment
+from app.models.savings_goal import SavingsGoal, GoalContribution
 from app.models.revoked_token import RevokedToken
 from app.models.audit_log import AuditLog
+from app.models.email_outbox import EmailOutbox
+from app.models.monthly_rollup import MonthlyRollup
+from app.models.ledger_checkpoint import LedgerCheckpoint
+from app.models.resource_version import ResourceVersion
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Integer, String, Float, DateTime, ForeignKey, Enum
+from sqlalchemy import Integer, String, Float, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
 
@@ -21,6 +21,7 @@ class AccountSubtype(str, enum.Enum):
 
 class Account(Base):
     __tablename__ = "accounts"
+    __table_args__ = (Index("ix_accounts_user_id", "user_id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
@@ -28,6 +29,9 @@ class Account(Base):
     type: Mapped[AccountType] = mapped_column(Enum(AccountType), nullable=False)
     account_subtype: Mapped[AccountSubtype] = mapped_column(Enum(AccountSubtype), nullable=False)
     balance: Mapped[float] = mapped_column(Float, default=0.0)
+    # Parte del saldo que no explican las transacciones (saldo inicial + ajustes manuales);
+    # la conciliación espera balance == opening_balance + efecto de las transacciones
+    opening_balance: Mapped[float] = mapped_column(Float, default=0.0, server_default="0", nullable=False)
     credit_limit: Mapped[float | None] = mapped_column(Float, nullable=True)
     color: Mapped[str] = mapped_column(String, default="#3B82F6")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
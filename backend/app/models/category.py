@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, Boolean, ForeignKey, Enum
+from sqlalchemy import Integer, String, Boolean, ForeignKey, Enum, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
 
@@ -12,6 +12,7 @@ class CategoryType(str, enum.Enum):
 
 class Category(Base):
     __tablename__ = "categories"
+    __table_args__ = (Index("ix_categories_user_id", "user_id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
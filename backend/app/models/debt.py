@@ -1,5 +1,5 @@
 from datetime import date as DateType, datetime, timezone
-from sqlalchemy import Integer, String, Float, Date, DateTime, ForeignKey, Enum
+from sqlalchemy import Integer, String, Float, Date, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
 
@@ -18,6 +18,7 @@ class DebtStatus(str, enum.Enum):
 
 class Debt(Base):
     __tablename__ = "debts"
+    __table_args__ = (Index("ix_debts_user_date", "user_id", "date"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
@@ -52,7 +53,7 @@ class DebtPayment(Base):
     __tablename__ = "debt_payments"
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    debt_id: Mapped[int] = mapped_column(Integer, ForeignKey("debts.id"), nullable=False)
+    debt_id: Mapped[int] = mapped_column(Integer, ForeignKey("debts.id"), nullable=False, index=True)
     amount: Mapped[float] = mapped_column(Float, nullable=False)
     date: Mapped[DateType] = mapped_column(Date, nullable=False)
     notes: Mapped[str] = mapped_column(String, default="")
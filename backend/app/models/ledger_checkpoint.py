@@ -0,0 +1,16 @@
+from datetime import datetime
+from sqlalchemy import Integer, DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class LedgerCheckpoint(Base):
+    """Última conciliación de saldos de un usuario (ver app/services/reconciliation.py)."""
+
+    __tablename__ = "ledger_checkpoints"
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    verified_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    accounts_checked: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    drifted_accounts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -0,0 +1,39 @@
+from datetime import datetime
+from sqlalchemy import Integer, Float, Boolean, DateTime, ForeignKey, Enum, Index, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+from app.models.transaction import TransactionType
+
+
+class MonthlyRollup(Base):
+    """Totales de transacciones por (usuario, mes, categoría, cuenta, tipo, transferencia).
+
+    Tabla derivada: se mantiene con deltas en la misma transacción que escribe en
+    `transactions` (ver app/services/rollups.py) y se puede regenerar desde cero.
+    category_id/account_id no llevan FK para no bloquear borrados; los huecos se
+    corrigen con la reconstrucción.
+    """
+
+    __tablename__ = "monthly_rollups"
+    __table_args__ = (
+        # category_id es nullable: COALESCE para que "sin categoría" sea una sola fila por clave
+        Index(
+            "uq_monthly_rollups_key",
+            "user_id", "year", "month", text("COALESCE(category_id, 0)"), "account_id", "type", "is_transfer",
+            unique=True,
+        ),
+        Index("ix_monthly_rollups_updated_at", "updated_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    year: Mapped[int] = mapped_column(Integer, nullable=False)
+    month: Mapped[int] = mapped_column(Integer, nullable=False)
+    category_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    account_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    type: Mapped[TransactionType] = mapped_column(Enum(TransactionType), nullable=False)
+    is_transfer: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    total: Mapped[float] = mapped_column(Float, nullable=False, default=0.0)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,5 +1,5 @@
 from datetime import date, datetime
-from sqlalchemy import Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Enum
+from sqlalchemy import Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Enum, Index, UniqueConstraint, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
 
@@ -16,6 +16,11 @@ class Frequency(str, enum.Enum):
 
 class RecurringExpense(Base):
     __tablename__ = "recurring_expenses"
+    __table_args__ = (
+        Index("ix_recurring_expenses_user_active_next", "user_id", "is_active", "next_date"),
+        # Barrido global del motor de recurrentes: activos vencidos de todos los usuarios
+        Index("ix_recurring_expenses_due", "next_date", postgresql_where=text("is_active")),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
@@ -42,10 +47,18 @@ class RecurringExpense(Base):
 
 class RecurringPayment(Base):
     __tablename__ = "recurring_payments"
+    __table_args__ = (
+        UniqueConstraint("recurring_expense_id", "occurrence_date", name="uq_recurring_payments_occurrence"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
-    recurring_expense_id: Mapped[int] = mapped_column(Integer, ForeignKey("recurring_expenses.id"), nullable=False)
+    recurring_expense_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("recurring_expenses.id"), nullable=False, index=True
+    )
     paid_date: Mapped[date] = mapped_column(Date, nullable=False)
+    # Fecha de la ocurrencia que cubre el pago (next_date al momento de pagar); hace
+    # idempotente el cobro de cada ocurrencia. Nula en pagos anteriores a la migración 012.
+    occurrence_date: Mapped[date | None] = mapped_column(Date, nullable=True)
     amount: Mapped[float] = mapped_column(Float, nullable=False)
 
     recurring_expense = relationship("RecurringExpense", back_populates="payments")
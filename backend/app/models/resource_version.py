@@ -0,0 +1,14 @@
+from sqlalchemy import BigInteger, Integer, String, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database import Base
+
+
+class ResourceVersion(Base):
+    """Contador de cambios por usuario y recurso; de él salen los ETag de los listados (ver app/utils/etag.py)."""
+
+    __tablename__ = "resource_versions"
+
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    resource: Mapped[str] = mapped_column(String, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
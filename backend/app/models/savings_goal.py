@@ -1,5 +1,5 @@
 from datetime import date, datetime
-from sqlalchemy import Integer, String, Float, Date, DateTime, ForeignKey, Enum, Boolean
+from sqlalchemy import Integer, String, Float, Date, DateTime, ForeignKey, Enum, Boolean, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
 
@@ -20,6 +20,7 @@ class WishlistStatus(str, enum.Enum):
 
 class SavingsGoal(Base):
     __tablename__ = "savings_goals"
+    __table_args__ = (Index("ix_savings_goals_user_created", "user_id", "created_at"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
@@ -31,6 +32,9 @@ class SavingsGoal(Base):
     color: Mapped[str] = mapped_column(String, default="#6366f1")
     status: Mapped[WishlistStatus] = mapped_column(Enum(WishlistStatus), default=WishlistStatus.active)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    # Denormalizados: se actualizan en cada aporte para no sumar el historial al listar
+    current_amount: Mapped[float] = mapped_column(Float, nullable=False, default=0.0, server_default="0")
+    contribution_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
 
     user = relationship("User", back_populates="savings_goals")
     contributions = relationship("GoalContribution", back_populates="goal", cascade="all, delete-orphan")
@@ -38,6 +42,8 @@ class SavingsGoal(Base):
 
 class GoalContribution(Base):
     __tablename__ = "goal_contributions"
+    # Historial paginado por keyset: (date, id) descendente dentro de cada meta
+    __table_args__ = (Index("ix_goal_contributions_goal_date", "goal_id", "date", "id"),)
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     goal_id: Mapped[int] = mapped_column(Integer, ForeignKey("savings_goals.id"), nullable=False)
@@ -1,5 +1,5 @@
 from datetime import date, datetime
-from sqlalchemy import Integer, String, Float, Date, DateTime, ForeignKey, Enum
+from sqlalchemy import Integer, String, Float, Date, DateTime, ForeignKey, Enum, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 import enum
 
@@ -13,6 +13,15 @@ class TransactionType(str, enum.Enum):
 
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        Index("ix_transactions_user_date", "user_id", text("date DESC"), text("created_at DESC"), text("id DESC")),
+        Index("ix_transactions_user_category_date", "user_id", "category_id", "date"),
+        Index("ix_transactions_account_date", "account_id", "date"),
+        Index(
+            "ix_transactions_user_type_date_no_transfer", "user_id", "type", "date",
+            postgresql_where=text("transfer_pair_id IS NULL"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
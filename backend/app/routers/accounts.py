@@ -1,49 +1,88 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.deps import get_db, get_current_user
+from app.deps import get_async_db, get_current_user_async
 from app.models.account import Account
 from app.models.user import User
 from app.schemas.account import AccountCreate, AccountUpdate, AccountOut
+from app.services.references import reference_rows
+from app.utils.cache import invalidate_dashboard, invalidate_references
+from app.utils.etag import conditional_response, version_bump, version_select
+from app.utils.serialization import encoded_response
 
 router = APIRouter(prefix="/accounts", tags=["accounts"])
 
 
+async def _get_account(db: AsyncSession, account_id: int, user_id: int) -> Account:
+    account = await db.scalar(select(Account).where(Account.id == account_id, Account.user_id == user_id))
+    if not account:
+        raise HTTPException(status_code=404, detail="Cuenta no encontrada")
+    return account
+
+
 @router.get("", response_model=list[AccountOut])
-def list_accounts(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return db.query(Account).filter(Account.user_id == current_user.id).all()
+async def list_accounts(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    version = await db.scalar(version_select(current_user.id, "accounts"))
+    if (not_modified := conditional_response(request, response, current_user.id, "accounts", version)) is not None:
+        return not_modified
+    rows = await reference_rows(db, current_user.id, "accounts", version)
+    return encoded_response(request, response, list[AccountOut], list(rows.values()), trusted=True)
 
 
 @router.post("", response_model=AccountOut, status_code=201)
-def create_account(data: AccountCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    account = Account(**data.model_dump(), user_id=current_user.id)
+async def create_account(
+    data: AccountCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    account = Account(**data.model_dump(), opening_balance=data.balance, user_id=current_user.id)
     db.add(account)
-    db.commit()
-    db.refresh(account)
+    await db.execute(version_bump(current_user.id, "accounts"))
+    await db.commit()
+    invalidate_dashboard(current_user.id)
+    invalidate_references(current_user.id, "accounts")
+    await db.refresh(account)
     return account
 
 
 @router.put("/{account_id}", response_model=AccountOut)
-def update_account(
+async def update_account(
     account_id: int,
     data: AccountUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
 ):
-    account = db.query(Account).filter(Account.id == account_id, Account.user_id == current_user.id).first()
-    if not account:
-        raise HTTPException(status_code=404, detail="Cuenta no encontrada")
-    for field, value in data.model_dump(exclude_none=True).items():
+    account = await _get_account(db, account_id, current_user.id)
+    changes = data.model_dump(exclude_none=True)
+    if "balance" in changes:
+        # Un saldo editado a mano es un ajuste, no una transacción
+        account.opening_balance += changes["balance"] - account.balance
+    for field, value in changes.items():
         setattr(account, field, value)
-    db.commit()
-    db.refresh(account)
+    await db.execute(version_bump(current_user.id, "accounts"))
+    await db.commit()
+    invalidate_dashboard(current_user.id)
+    invalidate_references(current_user.id, "accounts")
+    await db.refresh(account)
     return account
 
 
 @router.delete("/{account_id}", status_code=204)
-def delete_account(account_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    account = db.query(Account).filter(Account.id == account_id, Account.user_id == current_user.id).first()
-    if not account:
-        raise HTTPException(status_code=404, detail="Cuenta no encontrada")
-    db.delete(account)
-    db.commit()
+async def delete_account(
+    account_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    account = await _get_account(db, account_id, current_user.id)
+    await db.delete(account)
+    # Deudas y recurrentes pierden la referencia a la cuenta
+    await db.execute(version_bump(current_user.id, "accounts", "debts", "recurring"))
+    await db.commit()
+    invalidate_dashboard(current_user.id)
+    invalidate_references(current_user.id, "accounts")
@@ -5,8 +5,9 @@ from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 
 from app.config import settings
-from app.deps import get_db, get_current_user, oauth2_scheme
+from app.deps import get_db, get_current_user, invalidate_token, invalidate_user, oauth2_scheme
 from app.limiter import limiter
+from app.models.email_outbox import EmailKind
 from app.models.revoked_token import RevokedToken
 from app.models.user import User
 from app.schemas.user import (
@@ -22,8 +23,9 @@ from app.schemas.user import (
     UserPreferencesUpdate,
 )
 from app.utils.audit import log_action
-from app.utils.auth import decode_token, hash_password, verify_password, create_token
-from app.utils.email import send_reset_email, send_verification_email
+from app.utils.auth import PasswordHasherBusy, decode_token, hash_password, verify_password, create_token, password_needs_rehash
+from app.utils.email import email_delivery_enabled
+from app.utils.outbox import enqueue_email, wake_outbox_worker
 from app.utils.seed import seed_categories
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -34,7 +36,7 @@ def register(request: Request, data: UserCreate, db: Session = Depends(get_db)):
     if db.query(User).filter(User.email == data.email).first():
         raise HTTPException(status_code=400, detail="El email ya está registrado")
 
-    email_enabled = bool(settings.resend_api_key)
+    email_enabled = email_delivery_enabled()
     verify_token = secrets.token_urlsafe(32) if email_enabled else None
     user = User(
         email=data.email,
@@ -47,18 +49,16 @@ def register(request: Request, data: UserCreate, db: Session = Depends(get_db)):
         currency=data.currency,
     )
     db.add(user)
+    if email_enabled:
+        enqueue_email(db, EmailKind.verification, user.email, verify_token)
     db.commit()
     db.refresh(user)
     seed_categories(db, user.id)
-
     if email_enabled:
-        try:
-            send_verification_email(user.email, verify_token)
-        except Exception:
-            pass
+        wake_outbox_worker()
 
     ip = request.client.host if request.client else None
-    log_action(db, "register", user_id=user.id, ip=ip)
+    log_action("register", user_id=user.id, ip=ip)
     return RegisterResponse(
         message="Cuenta creada. Revisa tu email para verificar tu cuenta.",
         email=user.email,
@@ -74,12 +74,12 @@ def login(request: Request, data: dict, db: Session = Depends(get_db)):
 
     user = db.query(User).filter(User.email == email).first()
     if not user:
-        log_action(db, "login_failed", ip=ip, details=f"email:{email}")
+        log_action("login_failed", ip=ip, details=f"email:{email}")
         raise HTTPException(status_code=401, detail="No existe una cuenta con ese correo")
     if not user.password_hash:
         raise HTTPException(status_code=401, detail="Esta cuenta usa Google para iniciar sesión")
     if not verify_password(password, user.password_hash):
-        log_action(db, "login_failed", user_id=user.id, ip=ip)
+        log_action("login_failed", user_id=user.id, ip=ip)
         raise HTTPException(status_code=401, detail="Contraseña incorrecta")
     if not user.email_verified:
         raise HTTPException(
@@ -87,8 +87,19 @@ def login(request: Request, data: dict, db: Session = Depends(get_db)):
             detail="Debes verificar tu email antes de iniciar sesión",
         )
 
+    # Migrar transparentemente hashes con un costo de bcrypt distinto al configurado. Si el
+    # pool de hashing está lleno se deja para un login posterior: nunca hace fallar el login.
+    if password_needs_rehash(user.password_hash):
+        try:
+            user.password_hash = hash_password(password)
+        except PasswordHasherBusy:
+            pass
+        else:
+            db.commit()
+            invalidate_user(user.id)
+
     token = create_token(user.id)
-    log_action(db, "login_success", user_id=user.id, ip=ip)
+    log_action("login_success", user_id=user.id, ip=ip)
     return Token(access_token=token, token_type="bearer", user=UserOut.model_validate(user))
 
 
@@ -105,9 +116,10 @@ def logout(
         expires_at = datetime.utcfromtimestamp(payload["exp"])
         db.add(RevokedToken(jti=jti, expires_at=expires_at, revoked_at=datetime.utcnow()))
         db.commit()
+        invalidate_token(token, jti)
 
     ip = request.client.host if request.client else None
-    log_action(db, "logout", user_id=current_user.id, ip=ip)
+    log_action("logout", user_id=current_user.id, ip=ip)
     return {"message": "Sesión cerrada correctamente"}
 
 
@@ -120,9 +132,10 @@ def verify_email(request: Request, data: VerifyEmailRequest, db: Session = Depen
     user.email_verified = True
     user.email_verify_token = None
     db.commit()
+    invalidate_user(user.id)
 
     ip = request.client.host if request.client else None
-    log_action(db, "email_verified", user_id=user.id, ip=ip)
+    log_action("email_verified", user_id=user.id, ip=ip)
     return {"message": "Email verificado correctamente"}
 
 
@@ -135,13 +148,11 @@ def resend_verification(
     if user and not user.email_verified:
         verify_token = secrets.token_urlsafe(32)
         user.email_verify_token = verify_token
+        enqueue_email(db, EmailKind.verification, user.email, verify_token)
         db.commit()
-        try:
-            send_verification_email(user.email, verify_token)
-        except Exception:
-            pass
+        wake_outbox_worker()
         ip = request.client.host if request.client else None
-        log_action(db, "resend_verification", user_id=user.id, ip=ip)
+        log_action("resend_verification", user_id=user.id, ip=ip)
 
     return {"message": "Si el email existe y no está verificado, recibirás un correo"}
 
@@ -156,13 +167,11 @@ def forgot_password(
         reset_token = secrets.token_urlsafe(32)
         user.reset_token = reset_token
         user.reset_token_expires = datetime.utcnow() + timedelta(hours=1)
+        enqueue_email(db, EmailKind.password_reset, user.email, reset_token)
         db.commit()
-        try:
-            send_reset_email(user.email, reset_token)
-        except Exception:
-            pass
+        wake_outbox_worker()
         ip = request.client.host if request.client else None
-        log_action(db, "forgot_password_requested", user_id=user.id, ip=ip)
+        log_action("forgot_password_requested", user_id=user.id, ip=ip)
 
     return {"message": "Si el email existe, recibirás un correo con instrucciones"}
 
@@ -184,9 +193,10 @@ def reset_password(request: Request, data: ResetPasswordRequest, db: Session = D
     user.reset_token = None
     user.reset_token_expires = None
     db.commit()
+    invalidate_user(user.id)
 
     ip = request.client.host if request.client else None
-    log_action(db, "password_reset", user_id=user.id, ip=ip)
+    log_action("password_reset", user_id=user.id, ip=ip)
     return {"message": "Contraseña actualizada correctamente"}
 
 
@@ -204,6 +214,7 @@ def update_preferences(
     for field, value in data.model_dump(exclude_unset=True).items():
         setattr(current_user, field, value)
     db.commit()
+    invalidate_user(current_user.id)
     db.refresh(current_user)
     return current_user
 
@@ -252,10 +263,11 @@ def google_login(request: Request, data: dict, db: Session = Depends(get_db)):
             db.flush()
             seed_categories(db, user.id)
         db.commit()
+        invalidate_user(user.id)
         db.refresh(user)
 
     token = create_token(user.id)
-    log_action(db, "google_login", user_id=user.id, ip=ip)
+    log_action("google_login", user_id=user.id, ip=ip)
     return Token(access_token=token, token_type="bearer", user=UserOut.model_validate(user))
 
 
@@ -267,5 +279,6 @@ def complete_onboarding(
 ):
     current_user.onboarding_done = data.onboarding_done
     db.commit()
+    invalidate_user(current_user.id)
     db.refresh(current_user)
     return current_user
@@ -1,85 +1,156 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from app.deps import get_db, get_current_user
+from app.deps import get_async_db, get_current_user_async
 from app.models.budget import Budget
-from app.models.category import Category
-from app.models.transaction import Transaction, TransactionType
+from app.models.monthly_rollup import MonthlyRollup
+from app.models.transaction import TransactionType
 from app.models.user import User
 from app.schemas.budget import BudgetCreate, BudgetUpdate, BudgetOut
 
 router = APIRouter(prefix="/budgets", tags=["budgets"])
 
 
-@router.get("/month/{year}/{month}", response_model=list[BudgetOut])
-def get_budgets_month(
-    year: int,
-    month: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    budgets = (
-        db.query(Budget)
-        .filter(Budget.user_id == current_user.id, Budget.year == year, Budget.month == month)
-        .all()
+def _parse_month(value: str) -> tuple[int, int]:
+    try:
+        year, month = (int(part) for part in value.split("-"))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Mes inválido, formato esperado YYYY-MM")
+    if not 1 <= month <= 12:
+        raise HTTPException(status_code=400, detail="Mes inválido, formato esperado YYYY-MM")
+    return year, month
+
+
+async def _budgets_with_spent(
+    db: AsyncSession,
+    user_id: int,
+    start: tuple[int, int],
+    end: tuple[int, int],
+) -> list[BudgetOut]:
+    """Presupuestos entre dos meses (inclusive) con su gasto real, en una sola consulta.
+
+    El gasto sale del rollup mensual agregado por (año, mes, categoría) y se une a los
+    presupuestos; la categoría se carga con joinedload para no disparar un lazy load por fila.
+    """
+    rollup_month = MonthlyRollup.year * 12 + MonthlyRollup.month
+    spent = (
+        select(
+            MonthlyRollup.year.label("year"),
+            MonthlyRollup.month.label("month"),
+            MonthlyRollup.category_id.label("category_id"),
+            func.sum(MonthlyRollup.total).label("spent"),
+        )
+        .where(
+            MonthlyRollup.user_id == user_id,
+            MonthlyRollup.type == TransactionType.expense,
+            rollup_month >= start[0] * 12 + start[1],
+            rollup_month <= end[0] * 12 + end[1],
+        )
+        .group_by(MonthlyRollup.year, MonthlyRollup.month, MonthlyRollup.category_id)
+        .subquery()
+    )
+    month_index = Budget.year * 12 + Budget.month
+    rows = await db.execute(
+        select(Budget, func.coalesce(spent.c.spent, 0.0))
+        .outerjoin(
+            spent,
+            (spent.c.category_id == Budget.category_id)
+            & (spent.c.year == Budget.year)
+            & (spent.c.month == Budget.month),
+        )
+        .options(joinedload(Budget.category))
+        .where(
+            Budget.user_id == user_id,
+            month_index >= start[0] * 12 + start[1],
+            month_index <= end[0] * 12 + end[1],
+        )
+        .order_by(Budget.year, Budget.month, Budget.id)
     )
     result = []
-    for b in budgets:
-        from datetime import date
-        start = date(year, month, 1)
-        import calendar
-        end = date(year, month, calendar.monthrange(year, month)[1])
-        spent = db.query(func.sum(Transaction.amount)).filter(
-            Transaction.user_id == current_user.id,
-            Transaction.category_id == b.category_id,
-            Transaction.type == TransactionType.expense,
-            Transaction.date >= start,
-            Transaction.date <= end,
-        ).scalar() or 0.0
+    for b, spent_amount in rows:
         out = BudgetOut.model_validate(b)
-        out.spent = spent
+        out.spent = spent_amount
         result.append(out)
     return result
 
 
+async def _get_budget(db: AsyncSession, budget_id: int, user_id: int) -> Budget:
+    b = await db.scalar(select(Budget).where(Budget.id == budget_id, Budget.user_id == user_id))
+    if not b:
+        raise HTTPException(status_code=404, detail="Presupuesto no encontrado")
+    return b
+
+
+@router.get("/month/{year}/{month}", response_model=list[BudgetOut])
+async def get_budgets_month(
+    year: int,
+    month: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    if not 1 <= month <= 12:
+        raise HTTPException(status_code=400, detail="Mes inválido")
+    return await _budgets_with_spent(db, current_user.id, (year, month), (year, month))
+
+
+@router.get("/range", response_model=list[BudgetOut])
+async def get_budgets_range(
+    from_month: str = Query(..., alias="from"),
+    to_month: str = Query(..., alias="to"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    """Presupuesto vs. gasto real de varios meses (YYYY-MM a YYYY-MM), ordenado por mes."""
+    start = _parse_month(from_month)
+    end = _parse_month(to_month)
+    if start > end:
+        raise HTTPException(status_code=400, detail="El mes inicial debe ser anterior al final")
+    return await _budgets_with_spent(db, current_user.id, start, end)
+
+
 @router.post("", response_model=BudgetOut, status_code=201)
-def create_budget(data: BudgetCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    existing = db.query(Budget).filter(
+async def create_budget(
+    data: BudgetCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    existing = await db.scalar(select(Budget.id).where(
         Budget.user_id == current_user.id,
         Budget.category_id == data.category_id,
         Budget.month == data.month,
         Budget.year == data.year,
-    ).first()
+    ))
     if existing:
         raise HTTPException(status_code=400, detail="Ya existe un presupuesto para esta categoría y mes")
     b = Budget(**data.model_dump(), user_id=current_user.id)
     db.add(b)
-    db.commit()
-    db.refresh(b)
+    await db.commit()
+    await db.refresh(b, attribute_names=["category"])
     return BudgetOut.model_validate(b)
 
 
 @router.put("/{budget_id}", response_model=BudgetOut)
-def update_budget(
+async def update_budget(
     budget_id: int,
     data: BudgetUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
 ):
-    b = db.query(Budget).filter(Budget.id == budget_id, Budget.user_id == current_user.id).first()
-    if not b:
-        raise HTTPException(status_code=404, detail="Presupuesto no encontrado")
+    b = await _get_budget(db, budget_id, current_user.id)
     b.limit_amount = data.limit_amount
-    db.commit()
-    db.refresh(b)
+    await db.commit()
+    await db.refresh(b, attribute_names=["category"])
     return BudgetOut.model_validate(b)
 
 
 @router.delete("/{budget_id}", status_code=204)
-def delete_budget(budget_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    b = db.query(Budget).filter(Budget.id == budget_id, Budget.user_id == current_user.id).first()
-    if not b:
-        raise HTTPException(status_code=404, detail="Presupuesto no encontrado")
-    db.delete(b)
-    db.commit()
+async def delete_budget(
+    budget_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    b = await _get_budget(db, budget_id, current_user.id)
+    await db.delete(b)
+    await db.commit()
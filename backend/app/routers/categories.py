@@ -1,51 +1,87 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.deps import get_db, get_current_user
+from app.deps import get_async_db, get_current_user_async
 from app.models.category import Category
 from app.models.user import User
 from app.schemas.category import CategoryCreate, CategoryUpdate, CategoryOut
+from app.services.references import reference_rows
+from app.services.rollups import rollup_merge_category
+from app.utils.cache import invalidate_references
+from app.utils.etag import conditional_response, version_bump, version_select
+from app.utils.serialization import encoded_response
 
 router = APIRouter(prefix="/categories", tags=["categories"])
 
 
+async def _get_category(db: AsyncSession, category_id: int, user_id: int) -> Category:
+    cat = await db.scalar(select(Category).where(Category.id == category_id, Category.user_id == user_id))
+    if not cat:
+        raise HTTPException(status_code=404, detail="Categoría no encontrada")
+    return cat
+
+
 @router.get("", response_model=list[CategoryOut])
-def list_categories(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    return db.query(Category).filter(Category.user_id == current_user.id).all()
+async def list_categories(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    version = await db.scalar(version_select(current_user.id, "categories"))
+    if (not_modified := conditional_response(request, response, current_user.id, "categories", version)) is not None:
+        return not_modified
+    rows = await reference_rows(db, current_user.id, "categories", version)
+    return encoded_response(request, response, list[CategoryOut], list(rows.values()), trusted=True)
 
 
 @router.post("", response_model=CategoryOut, status_code=201)
-def create_category(data: CategoryCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+async def create_category(
+    data: CategoryCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
     cat = Category(**data.model_dump(), user_id=current_user.id, is_default=False)
     db.add(cat)
-    db.commit()
-    db.refresh(cat)
+    await db.execute(version_bump(current_user.id, "categories"))
+    await db.commit()
+    invalidate_references(current_user.id, "categories")
+    await db.refresh(cat)
     return cat
 
 
 @router.put("/{category_id}", response_model=CategoryOut)
-def update_category(
+async def update_category(
     category_id: int,
     data: CategoryUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
 ):
-    cat = db.query(Category).filter(Category.id == category_id, Category.user_id == current_user.id).first()
-    if not cat:
-        raise HTTPException(status_code=404, detail="Categoría no encontrada")
+    cat = await _get_category(db, category_id, current_user.id)
     for field, value in data.model_dump(exclude_none=True).items():
         setattr(cat, field, value)
-    db.commit()
-    db.refresh(cat)
+    await db.execute(version_bump(current_user.id, "categories"))
+    await db.commit()
+    invalidate_references(current_user.id, "categories")
+    await db.refresh(cat)
     return cat
 
 
 @router.delete("/{category_id}", status_code=204)
-def delete_category(category_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    cat = db.query(Category).filter(Category.id == category_id, Category.user_id == current_user.id).first()
-    if not cat:
-        raise HTTPException(status_code=404, detail="Categoría no encontrada")
+async def delete_category(
+    category_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    cat = await _get_category(db, category_id, current_user.id)
     if cat.is_default:
         raise HTTPException(status_code=400, detail="No se puede eliminar una categoría predeterminada")
-    db.delete(cat)
-    db.commit()
+    await db.delete(cat)
+    # Sus transacciones quedan sin categoría: mover también sus totales del rollup
+    for stmt in rollup_merge_category(cat.id):
+        await db.execute(stmt)
+    # Los recurrentes de la categoría quedan sin categoría
+    await db.execute(version_bump(current_user.id, "categories", "recurring"))
+    await db.commit()
+    invalidate_references(current_user.id, "categories")
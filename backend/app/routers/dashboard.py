@@ -1,67 +1,76 @@
 from datetime import date, timedelta
-import calendar
-from fastapi import APIRouter, Depends
-from sqlalchemy import func
-from sqlalchemy.orm import Session
+import json
+from fastapi import APIRouter, Depends, Response
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.deps import get_db, get_current_user
+from app.deps import get_async_db, get_current_user_async
 from app.models.account import Account, AccountType
+from app.models.monthly_rollup import MonthlyRollup
 from app.models.recurring import RecurringExpense
 from app.models.transaction import Transaction, TransactionType
 from app.models.user import User
+from app.utils.cache import dashboard_cache
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 
 @router.get("/summary")
-def get_summary(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    accounts = db.query(Account).filter(Account.user_id == current_user.id).all()
+async def get_summary(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user_async)):
+    """Resumen del dashboard. Se sirve desde cache hasta la próxima escritura del usuario."""
+    today = date.today()
+    cached = dashboard_cache.get(current_user.id)
+    # La fecha va en el valor: el mes en curso y los próximos 7 días cambian a medianoche
+    if cached is not None and cached[0] == today:
+        return Response(content=cached[1], media_type="application/json")
+
+    epoch = dashboard_cache.epoch
+    body = json.dumps(jsonable_encoder(await _build_summary(db, current_user.id, today))).encode("utf-8")
+    dashboard_cache.set(current_user.id, (today, body), epoch=epoch)
+    return Response(content=body, media_type="application/json")
+
+
+async def _build_summary(db: AsyncSession, user_id: int, today: date) -> dict:
+    accounts = (await db.scalars(select(Account).where(Account.user_id == user_id))).all()
 
     total_assets = sum(a.balance for a in accounts if a.type == AccountType.debit)
     total_debt = sum(a.balance for a in accounts if a.type == AccountType.credit)
     net_balance = total_assets - total_debt
 
-    today = date.today()
-    start_month = today.replace(day=1)
-    end_month = today.replace(day=calendar.monthrange(today.year, today.month)[1])
-
-    # Excluir transferencias entre cuentas propias (transfer_pair_id != None)
-    income_month = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.user_id == current_user.id,
-        Transaction.type == TransactionType.income,
-        Transaction.date >= start_month,
-        Transaction.date <= end_month,
-        Transaction.transfer_pair_id == None,
-    ).scalar() or 0.0
-
-    expense_month = db.query(func.sum(Transaction.amount)).filter(
-        Transaction.user_id == current_user.id,
-        Transaction.type == TransactionType.expense,
-        Transaction.date >= start_month,
-        Transaction.date <= end_month,
-        Transaction.transfer_pair_id == None,
-    ).scalar() or 0.0
+    # Ingresos y gastos del mes desde el rollup mensual (unas pocas filas por usuario).
+    # Excluir transferencias entre cuentas propias
+    month_totals = await db.execute(
+        select(
+            func.coalesce(func.sum(case((MonthlyRollup.type == TransactionType.income, MonthlyRollup.total))), 0.0),
+            func.coalesce(func.sum(case((MonthlyRollup.type == TransactionType.expense, MonthlyRollup.total))), 0.0),
+        ).where(
+            MonthlyRollup.user_id == user_id,
+            MonthlyRollup.year == today.year,
+            MonthlyRollup.month == today.month,
+            MonthlyRollup.is_transfer == False,
+        )
+    )
+    income_month, expense_month = month_totals.one()
 
     upcoming_limit = today + timedelta(days=7)
-    upcoming = (
-        db.query(RecurringExpense)
-        .filter(
-            RecurringExpense.user_id == current_user.id,
+    upcoming = (await db.scalars(
+        select(RecurringExpense)
+        .where(
+            RecurringExpense.user_id == user_id,
             RecurringExpense.is_active == True,
             RecurringExpense.next_date >= today,
             RecurringExpense.next_date <= upcoming_limit,
         )
         .order_by(RecurringExpense.next_date)
-        .all()
-    )
+    )).all()
 
-    recent_transactions = (
-        db.query(Transaction)
-        .filter(Transaction.user_id == current_user.id)
+    recent_transactions = (await db.scalars(
+        select(Transaction)
+        .where(Transaction.user_id == user_id)
         .order_by(Transaction.date.desc(), Transaction.created_at.desc())
         .limit(5)
-        .all()
-    )
+    )).all()
 
     return {
         "total_assets": total_assets,
@@ -1,5 +1,5 @@
 from datetime import date
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
 
 from app.deps import get_db, get_current_user
@@ -7,7 +7,17 @@ from app.models.account import Account, AccountType
 from app.models.debt import Debt, DebtPayment, DebtStatus
 from app.models.transaction import Transaction, TransactionType
 from app.models.user import User
-from app.schemas.debt import DebtCreate, DebtUpdate, DebtPaymentCreate, DebtOut, DebtPaymentOut
+from app.schemas.debt import (
+    DebtCreate, DebtUpdate, DebtPaymentCreate, DebtOut, DebtPaymentOut, DebtScheduleOut,
+    PayoffStrategyOut, PayoffStrategyRequest,
+)
+from app.services.amortization import debt_schedules
+from app.services.payoff import compare_strategies
+from app.services.balances import balance_update
+from app.services.rollups import rollup_upsert
+from app.utils.cache import invalidate_dashboard, invalidate_debt_schedules
+from app.utils.etag import conditional_response, version_bump, version_select
+from app.utils.retry import retry_on_conflict
 
 router = APIRouter(prefix="/debts", tags=["debts"])
 
@@ -25,13 +35,62 @@ def _create_transaction(db: Session, user_id: int, account_id: int, tx_type: Tra
         description=description,
     )
     db.add(tx)
+    db.execute(rollup_upsert([tx]))
+
+
+def _withdraw(db: Session, account: Account, amount: float) -> None:
+    """Saca dinero de la cuenta (o lo carga a la tarjeta) validando saldo o cupo en el mismo UPDATE."""
+    stmt = balance_update(account.id, TransactionType.expense, amount, check_funds=True, check_limit=True)
+    if db.execute(stmt).first() is None:
+        if account.type == AccountType.debit:
+            raise HTTPException(status_code=400, detail="Saldo insuficiente en la cuenta seleccionada")
+        raise HTTPException(status_code=400, detail="El monto supera el cupo disponible de la tarjeta")
 
 
 @router.get("", response_model=list[DebtOut])
-def list_debts(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def list_debts(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    version = db.scalar(version_select(current_user.id, "debts"))
+    if (not_modified := conditional_response(request, response, current_user.id, "debts", version)) is not None:
+        return not_modified
     return db.query(Debt).filter(Debt.user_id == current_user.id).order_by(Debt.date.desc()).all()
 
 
+@router.get("/schedules", response_model=list[DebtScheduleOut])
+def list_schedules(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Tablas de amortización de todas las deudas activas, calculadas juntas."""
+    return list(debt_schedules(db, current_user.id).values())
+
+
+@router.get("/{debt_id}/schedule", response_model=DebtScheduleOut)
+def get_schedule(debt_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    schedule = debt_schedules(db, current_user.id).get(debt_id)
+    if schedule is None:
+        if not db.query(Debt.id).filter(Debt.id == debt_id, Debt.user_id == current_user.id).first():
+            raise HTTPException(status_code=404, detail="Deuda no encontrada")
+        raise HTTPException(status_code=400, detail="La deuda ya está pagada")
+    return schedule
+
+
+@router.post("/strategy", response_model=PayoffStrategyOut)
+def payoff_strategy(
+    data: PayoffStrategyRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Compara cómo repartir un presupuesto mensual entre las deudas activas que debo."""
+    if data.monthly_budget <= 0:
+        raise HTTPException(status_code=400, detail="El presupuesto mensual debe ser mayor a 0")
+    try:
+        return compare_strategies(db, current_user.id, data.monthly_budget, data.custom_order)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("", response_model=DebtOut, status_code=201)
 def create_debt(data: DebtCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     if data.original_amount <= 0:
@@ -42,14 +101,8 @@ def create_debt(data: DebtCreate, db: Session = Depends(get_db), current_user: U
         account = db.query(Account).filter(Account.id == data.account_id, Account.user_id == current_user.id).first()
         if not account:
             raise HTTPException(status_code=404, detail="Cuenta no encontrada")
-        if account.type == AccountType.debit:
-            if account.balance < data.original_amount:
-                raise HTTPException(status_code=400, detail="Saldo insuficiente en la cuenta seleccionada")
-            account.balance -= data.original_amount
-        else:  # crédito → prestar con tarjeta sube la deuda de la tarjeta
-            if account.credit_limit is not None and account.balance + data.original_amount > account.credit_limit:
-                raise HTTPException(status_code=400, detail="El monto supera el cupo disponible de la tarjeta")
-            account.balance += data.original_amount
+        # En crédito, prestar con tarjeta sube la deuda de la tarjeta
+        _withdraw(db, account, data.original_amount)
 
         # Registrar la transacción de salida (préstamo otorgado)
         _create_transaction(
@@ -71,7 +124,10 @@ def create_debt(data: DebtCreate, db: Session = Depends(get_db), current_user: U
         estimated_end_date=data.estimated_end_date,
     )
     db.add(debt)
+    db.execute(version_bump(current_user.id, "debts", *(["accounts"] if debt.account_id else [])))
     db.commit()
+    invalidate_dashboard(current_user.id)
+    invalidate_debt_schedules(current_user.id)
     db.refresh(debt)
     return debt
 
@@ -88,7 +144,10 @@ def update_debt(
         raise HTTPException(status_code=404, detail="Deuda no encontrada")
     for field, value in data.model_dump(exclude_none=True).items():
         setattr(debt, field, value)
+    db.execute(version_bump(current_user.id, "debts"))
     db.commit()
+    invalidate_dashboard(current_user.id)
+    invalidate_debt_schedules(current_user.id)
     db.refresh(debt)
     return debt
 
@@ -101,13 +160,9 @@ def delete_debt(debt_id: int, db: Session = Depends(get_db), current_user: User
 
     # Si presté dinero y queda saldo pendiente, devolver el restante a la cuenta de origen
     if debt.type.value == "owed" and debt.remaining_amount > 0 and debt.account_id is not None:
-        account = db.query(Account).filter(Account.id == debt.account_id, Account.user_id == current_user.id).first()
-        if account:
-            if account.type == AccountType.debit:
-                account.balance += debt.remaining_amount
-            else:  # crédito → reversar baja la deuda de la tarjeta
-                account.balance -= debt.remaining_amount
-
+        # En crédito, reversar baja la deuda de la tarjeta; sin fila devuelta la cuenta ya no existe
+        stmt = balance_update(debt.account_id, TransactionType.income, debt.remaining_amount, user_id=current_user.id)
+        if db.execute(stmt).first() is not None:
             # Registrar la transacción de reversión
             _create_transaction(
                 db, current_user.id, debt.account_id,
@@ -116,17 +171,22 @@ def delete_debt(debt_id: int, db: Session = Depends(get_db), current_user: User
             )
 
     db.delete(debt)
+    db.execute(version_bump(current_user.id, "accounts", "debts"))
     db.commit()
+    invalidate_dashboard(current_user.id)
+    invalidate_debt_schedules(current_user.id)
 
 
 @router.post("/{debt_id}/payments", response_model=DebtPaymentOut, status_code=201)
+@retry_on_conflict
 def add_payment(
     debt_id: int,
     data: DebtPaymentCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    debt = db.query(Debt).filter(Debt.id == debt_id, Debt.user_id == current_user.id).first()
+    # FOR UPDATE: dos abonos simultáneos no pueden dejar el saldo pendiente por debajo de cero
+    debt = db.query(Debt).filter(Debt.id == debt_id, Debt.user_id == current_user.id).with_for_update().first()
     if not debt:
         raise HTTPException(status_code=404, detail="Deuda no encontrada")
     if data.amount <= 0:
@@ -139,15 +199,8 @@ def add_payment(
         raise HTTPException(status_code=404, detail="Cuenta no encontrada")
 
     if debt.type.value == "owe":
-        # Yo debo → el abono es un GASTO que sale de mi cuenta
-        if account.type == AccountType.debit:
-            if account.balance < data.amount:
-                raise HTTPException(status_code=400, detail="Saldo insuficiente en la cuenta seleccionada")
-            account.balance -= data.amount
-        else:  # crédito → usar tarjeta para pagar sube la deuda de la tarjeta
-            if account.credit_limit is not None and account.balance + data.amount > account.credit_limit:
-                raise HTTPException(status_code=400, detail="El monto supera el cupo disponible de la tarjeta")
-            account.balance += data.amount
+        # Yo debo → el abono es un GASTO que sale de mi cuenta (en crédito sube la deuda de la tarjeta)
+        _withdraw(db, account, data.amount)
 
         _create_transaction(
             db, current_user.id, data.account_id,
@@ -155,11 +208,8 @@ def add_payment(
             f"Abono a deuda con {debt.counterpart_name}",
         )
     else:
-        # Me deben → recibo el abono, es un INGRESO a mi cuenta
-        if account.type == AccountType.debit:
-            account.balance += data.amount
-        else:  # crédito → ingreso reduce deuda de la tarjeta
-            account.balance -= data.amount
+        # Me deben → recibo el abono, es un INGRESO a mi cuenta (en crédito reduce la deuda de la tarjeta)
+        db.execute(balance_update(account.id, TransactionType.income, data.amount))
 
         _create_transaction(
             db, current_user.id, data.account_id,
@@ -174,6 +224,9 @@ def add_payment(
 
     payment = DebtPayment(debt_id=debt_id, **{k: v for k, v in data.model_dump().items() if k != "account_id"})
     db.add(payment)
+    db.execute(version_bump(current_user.id, "accounts", "debts"))
     db.commit()
+    invalidate_dashboard(current_user.id)
+    invalidate_debt_schedules(current_user.id)
     db.refresh(payment)
     return payment
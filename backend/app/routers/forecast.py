@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.deps import get_db, get_current_user
+from app.models.user import User
+from app.schemas.forecast import ForecastOut
+from app.services.forecast import forecast
+
+router = APIRouter(prefix="/forecast", tags=["forecast"])
+
+
+@router.get("", response_model=ForecastOut)
+def get_forecast(
+    days: int = Query(90, ge=1, le=366),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Saldo diario proyectado de cada cuenta con recurrentes, cuotas de metas y planes de deuda."""
+    return forecast(db, current_user.id, days)
@@ -0,0 +1,25 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from app.config import settings
+from app.database import pool_stats
+
+router = APIRouter(prefix="/internal", tags=["internal"])
+
+
+def require_internal_token(x_internal_token: str | None = Header(None)):
+    """Exige el header X-Internal-Token igual a INTERNAL_STATS_TOKEN.
+
+    Sin token configurado los endpoints internos no existen (404): nunca quedan públicos.
+    """
+    if not settings.internal_stats_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(x_internal_token or "", settings.internal_stats_token):
+        raise HTTPException(status_code=403, detail="No autorizado")
+
+
+@router.get("/db-pool", dependencies=[Depends(require_internal_token)])
+def get_db_pool_stats():
+    """Estado y contadores de los pools de conexiones (sync y async)."""
+    return pool_stats()
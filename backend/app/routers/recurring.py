@@ -1,43 +1,85 @@
-from datetime import date, timedelta
-from dateutil.relativedelta import relativedelta
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
 from app.deps import get_db, get_current_user
 from app.models.account import Account
-from app.models.debt import Debt, DebtPayment, DebtStatus
-from app.models.recurring import RecurringExpense, RecurringPayment, Frequency
+from app.models.recurring import RecurringExpense, RecurringPayment
 from app.models.transaction import Transaction, TransactionType
 from app.models.user import User
-from app.schemas.recurring import RecurringCreate, RecurringUpdate, RecurringOut
+from app.schemas.recurring import RecurringCreate, RecurringUpdate, RecurringOccurrence, RecurringOut
+from app.services.balances import balance_update
+from app.services.recurrence import expand_many
+from app.services.recurring_engine import apply_debt_payment, next_occurrence
+from app.services.rollups import rollup_upsert
+from app.utils.cache import invalidate_dashboard, invalidate_debt_schedules
+from app.utils.etag import conditional_response, version_bump, version_select
 
 router = APIRouter(prefix="/recurring", tags=["recurring"])
 
-
-def _next_date(current: date, frequency: Frequency) -> date:
-    if frequency == Frequency.daily:
-        return current + timedelta(days=1)
-    elif frequency == Frequency.weekly:
-        return current + timedelta(weeks=1)
-    elif frequency == Frequency.biweekly:
-        return current + timedelta(weeks=2)
-    elif frequency == Frequency.monthly:
-        return current + relativedelta(months=1)
-    elif frequency == Frequency.yearly:
-        return current + relativedelta(years=1)
-    return current
+MAX_CALENDAR_DAYS = 731
 
 
 @router.get("", response_model=list[RecurringOut])
-def list_recurring(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def list_recurring(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    version = db.scalar(version_select(current_user.id, "recurring"))
+    if (not_modified := conditional_response(request, response, current_user.id, "recurring", version)) is not None:
+        return not_modified
     return db.query(RecurringExpense).filter(RecurringExpense.user_id == current_user.id).all()
 
 
+@router.get("/calendar", response_model=list[RecurringOccurrence])
+def recurring_calendar(
+    from_date: date = Query(..., alias="from"),
+    to_date: date = Query(..., alias="to"),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Todas las ocurrencias pendientes de los recurrentes activos entre dos fechas, por fecha.
+
+    Se expanden desde next_date: las ocurrencias anteriores ya están pagadas.
+    """
+    if from_date > to_date:
+        raise HTTPException(status_code=400, detail="La fecha inicial debe ser anterior a la final")
+    if (to_date - from_date).days > MAX_CALENDAR_DAYS:
+        raise HTTPException(status_code=400, detail="El rango máximo es de 2 años")
+    items = (
+        db.query(RecurringExpense)
+        .filter(RecurringExpense.user_id == current_user.id, RecurringExpense.is_active.is_(True))
+        .order_by(RecurringExpense.id)
+        .all()
+    )
+    if not items:
+        return []
+    series, dates = expand_many([r.next_date for r in items], [r.frequency for r in items], from_date, to_date)
+    return [
+        {
+            "date": d,
+            "recurring_id": items[i].id,
+            "name": items[i].name,
+            "amount": items[i].amount,
+            "account_id": items[i].account_id,
+            "category_id": items[i].category_id,
+            "debt_id": items[i].debt_id,
+        }
+        for i, d in zip(series.tolist(), dates.tolist())
+    ]
+
+
 @router.post("", response_model=RecurringOut, status_code=201)
 def create_recurring(data: RecurringCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     r = RecurringExpense(**data.model_dump(), user_id=current_user.id)
     db.add(r)
+    db.execute(version_bump(current_user.id, "recurring"))
     db.commit()
+    invalidate_dashboard(current_user.id)
+    invalidate_debt_schedules(current_user.id)
     db.refresh(r)
     return r
 
@@ -54,7 +96,10 @@ def update_recurring(
         raise HTTPException(status_code=404, detail="Recurrente no encontrado")
     for field, value in data.model_dump(exclude_none=True).items():
         setattr(r, field, value)
+    db.execute(version_bump(current_user.id, "recurring"))
     db.commit()
+    invalidate_dashboard(current_user.id)
+    invalidate_debt_schedules(current_user.id)
     db.refresh(r)
     return r
 
@@ -65,20 +110,36 @@ def delete_recurring(recurring_id: int, db: Session = Depends(get_db), current_u
     if not r:
         raise HTTPException(status_code=404, detail="Recurrente no encontrado")
     db.delete(r)
+    db.execute(version_bump(current_user.id, "recurring"))
     db.commit()
+    invalidate_dashboard(current_user.id)
+    invalidate_debt_schedules(current_user.id)
 
 
 @router.post("/{recurring_id}/pay", status_code=201)
 def pay_recurring(recurring_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    r = db.query(RecurringExpense).filter(RecurringExpense.id == recurring_id, RecurringExpense.user_id == current_user.id).first()
+    # FOR UPDATE: serializa con el motor de recurrentes para no pagar dos veces la misma ocurrencia
+    r = (
+        db.query(RecurringExpense)
+        .filter(RecurringExpense.id == recurring_id, RecurringExpense.user_id == current_user.id)
+        .with_for_update()
+        .first()
+    )
     if not r:
         raise HTTPException(status_code=404, detail="Recurrente no encontrado")
-    account = db.query(Account).filter(Account.id == r.account_id).first()
-    if not account:
+    if not db.query(Account.id).filter(Account.id == r.account_id).first():
         raise HTTPException(status_code=404, detail="Cuenta no encontrada")
 
     today = date.today()
-    payment = RecurringPayment(recurring_expense_id=r.id, paid_date=today, amount=r.amount)
+    # Si la ocurrencia ya se pagó (p. ej. next_date se movió hacia atrás) no se cobra de nuevo
+    paid = db.scalar(
+        insert(RecurringPayment)
+        .values(recurring_expense_id=r.id, paid_date=today, occurrence_date=r.next_date, amount=r.amount)
+        .on_conflict_do_nothing(constraint="uq_recurring_payments_occurrence")
+        .returning(RecurringPayment.id)
+    )
+    if paid is None:
+        raise HTTPException(status_code=409, detail="Ocurrencia ya pagada")
     tx = Transaction(
         user_id=current_user.id,
         account_id=r.account_id,
@@ -88,30 +149,16 @@ def pay_recurring(recurring_id: int, db: Session = Depends(get_db), current_user
         date=today,
         description=f"Pago recurrente: {r.name}",
     )
-    from app.routers.transactions import _apply_balance
-    _apply_balance(account, TransactionType.expense, r.amount)
-    r.next_date = _next_date(r.next_date, r.frequency)
-    db.add(payment)
+    db.execute(balance_update(r.account_id, TransactionType.expense, r.amount))
+    r.next_date = next_occurrence(r.next_date, r.frequency)
     db.add(tx)
+    db.execute(rollup_upsert([tx]))
 
     # Spec 005: si está vinculado a una deuda activa, abonar automáticamente
-    if r.debt_id:
-        debt = db.query(Debt).filter(
-            Debt.id == r.debt_id,
-            Debt.user_id == current_user.id,
-            Debt.status == DebtStatus.active,
-        ).first()
-        if debt:
-            payment_amount = min(r.amount, debt.remaining_amount)
-            debt.remaining_amount = max(0, debt.remaining_amount - payment_amount)
-            if debt.remaining_amount <= 0:
-                debt.status = DebtStatus.paid
-            db.add(DebtPayment(
-                debt_id=debt.id,
-                amount=payment_amount,
-                date=today,
-                notes=f"Pago automático desde recurrente: {r.name}",
-            ))
+    apply_debt_payment(db, r, today)
 
+    db.execute(version_bump(current_user.id, "accounts", "recurring", *(["debts"] if r.debt_id else [])))
     db.commit()
+    invalidate_dashboard(current_user.id)
+    invalidate_debt_schedules(current_user.id)
     return {"message": "Pago registrado", "next_date": r.next_date}
@@ -1,13 +1,18 @@
+import base64
+import json
 import math
 from datetime import date, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import tuple_, update
 from sqlalchemy.orm import Session
 
 from app.deps import get_db, get_current_user
 from app.models.savings_goal import SavingsGoal, GoalContribution, WishlistStatus
 from app.models.user import User
 from app.schemas.savings_goal import GoalCreate, GoalUpdate, ContributionCreate, GoalOut, ContributionOut
+from app.utils.etag import conditional_response, version_bump, version_select
+from app.utils.serialization import encoded_response
 
 router = APIRouter(prefix="/goals", tags=["goals"])
 
@@ -19,8 +24,29 @@ DAYS_PER_PERIOD = {
 }
 
 
+def _encode_cursor(c: GoalContribution) -> str:
+    raw = json.dumps([c.date.isoformat(), c.id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[date, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        d, contribution_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return date.fromisoformat(d), int(contribution_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _get_goal(db: Session, goal_id: int, user_id: int) -> SavingsGoal:
+    goal = db.query(SavingsGoal).filter(SavingsGoal.id == goal_id, SavingsGoal.user_id == user_id).first()
+    if not goal:
+        raise HTTPException(status_code=404, detail="Meta no encontrada")
+    return goal
+
+
 def _compute_summary(goal: SavingsGoal) -> dict:
-    current = sum(c.amount for c in goal.contributions)
+    current = goal.current_amount
     remaining = max(goal.target_amount - current, 0)
     estimated_date = None
     estimated_months = None
@@ -30,7 +56,6 @@ def _compute_summary(goal: SavingsGoal) -> dict:
         estimated_date = date.today() + timedelta(days=days)
         estimated_months = round(days / 30, 1)
     return {
-        "current_amount": current,
         "remaining_amount": remaining,
         "estimated_date": estimated_date,
         "estimated_months": estimated_months,
@@ -40,7 +65,6 @@ def _compute_summary(goal: SavingsGoal) -> dict:
 def _enrich(goal: SavingsGoal) -> GoalOut:
     data = GoalOut.model_validate(goal)
     summary = _compute_summary(goal)
-    data.current_amount = summary["current_amount"]
     data.remaining_amount = summary["remaining_amount"]
     data.estimated_date = summary["estimated_date"]
     data.estimated_months = summary["estimated_months"]
@@ -48,14 +72,23 @@ def _enrich(goal: SavingsGoal) -> GoalOut:
 
 
 @router.get("", response_model=list[GoalOut])
-def list_goals(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def list_goals(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # La fecha estimada depende del día, así que también entra en el ETag
+    version = f"{db.scalar(version_select(current_user.id, 'goals'))}.{date.today():%Y%m%d}"
+    if (not_modified := conditional_response(request, response, current_user.id, "goals", version)) is not None:
+        return not_modified
     goals = (
         db.query(SavingsGoal)
         .filter(SavingsGoal.user_id == current_user.id)
         .order_by(SavingsGoal.created_at.desc())
         .all()
     )
-    return [_enrich(g) for g in goals]
+    return encoded_response(request, response, list[GoalOut], [_enrich(g) for g in goals])
 
 
 @router.post("", response_model=GoalOut, status_code=201)
@@ -66,6 +99,7 @@ def create_goal(
 ):
     goal = SavingsGoal(**data.model_dump(), user_id=current_user.id)
     db.add(goal)
+    db.execute(version_bump(current_user.id, "goals"))
     db.commit()
     db.refresh(goal)
     return _enrich(goal)
@@ -78,11 +112,10 @@ def update_goal(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    goal = db.query(SavingsGoal).filter(SavingsGoal.id == goal_id, SavingsGoal.user_id == current_user.id).first()
-    if not goal:
-        raise HTTPException(status_code=404, detail="Meta no encontrada")
+    goal = _get_goal(db, goal_id, current_user.id)
     for field, value in data.model_dump(exclude_unset=True).items():
         setattr(goal, field, value)
+    db.execute(version_bump(current_user.id, "goals"))
     db.commit()
     db.refresh(goal)
     return _enrich(goal)
@@ -94,10 +127,9 @@ def delete_goal(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    goal = db.query(SavingsGoal).filter(SavingsGoal.id == goal_id, SavingsGoal.user_id == current_user.id).first()
-    if not goal:
-        raise HTTPException(status_code=404, detail="Meta no encontrada")
+    goal = _get_goal(db, goal_id, current_user.id)
     db.delete(goal)
+    db.execute(version_bump(current_user.id, "goals"))
     db.commit()
 
 
@@ -108,26 +140,57 @@ def add_contribution(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    goal = db.query(SavingsGoal).filter(SavingsGoal.id == goal_id, SavingsGoal.user_id == current_user.id).first()
-    if not goal:
-        raise HTTPException(status_code=404, detail="Meta no encontrada")
-    contribution = GoalContribution(goal_id=goal_id, **data.model_dump())
-    db.add(contribution)
+    goal = _get_goal(db, goal_id, current_user.id)
+    db.add(GoalContribution(goal_id=goal_id, **data.model_dump()))
+    # Acumulado en SQL: dos aportes simultáneos no se pisan
+    db.execute(
+        update(SavingsGoal)
+        .where(SavingsGoal.id == goal_id)
+        .values(
+            current_amount=SavingsGoal.current_amount + data.amount,
+            contribution_count=SavingsGoal.contribution_count + 1,
+        )
+    )
+    db.execute(version_bump(current_user.id, "goals"))
     db.commit()
     db.refresh(goal)
     return _enrich(goal)
 
 
+@router.get("/{goal_id}/contributions", response_model=list[ContributionOut])
+def list_contributions(
+    goal_id: int,
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Historial de aportes de la meta, del más reciente al más antiguo, paginado por keyset.
+
+    El cursor de la siguiente página viaja en el header `X-Next-Cursor` (ausente en la última).
+    """
+    _get_goal(db, goal_id, current_user.id)
+    q = db.query(GoalContribution).filter(GoalContribution.goal_id == goal_id)
+    if cursor:
+        q = q.filter(tuple_(GoalContribution.date, GoalContribution.id) < _decode_cursor(cursor))
+    # Una fila extra para saber si hay otra página sin un COUNT aparte
+    rows = q.order_by(GoalContribution.date.desc(), GoalContribution.id.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+    return rows
+
+
 @router.post("/{goal_id}/achieve", response_model=GoalOut)
 def mark_achieved(
     goal_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    goal = db.query(SavingsGoal).filter(SavingsGoal.id == goal_id, SavingsGoal.user_id == current_user.id).first()
-    if not goal:
-        raise HTTPException(status_code=404, detail="Meta no encontrada")
+    goal = _get_goal(db, goal_id, current_user.id)
     goal.status = WishlistStatus.achieved
+    db.execute(version_bump(current_user.id, "goals"))
     db.commit()
     db.refresh(goal)
     return _enrich(goal)
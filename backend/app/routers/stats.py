@@ -0,0 +1,87 @@
+from datetime import date
+from fastapi import APIRouter, Depends, Path
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.deps import get_db, get_current_user
+from app.models.category import Category
+from app.models.monthly_rollup import MonthlyRollup
+from app.models.transaction import Transaction, TransactionType
+from app.models.user import User
+from app.schemas.stats import CategoryTotal, DailySpend, MonthlyTotals, YearStatsOut
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+
+@router.get("/{year}", response_model=YearStatsOut)
+def get_year_stats(year: int = Path(..., ge=1, le=9999), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Totales del año: por mes y por categoría desde el rollup mensual, gasto diario en SQL."""
+    # Igual que el dashboard: excluir transferencias entre cuentas propias
+    rollup_filters = (
+        MonthlyRollup.user_id == current_user.id,
+        MonthlyRollup.year == year,
+        MonthlyRollup.is_transfer == False,
+    )
+    rollup_expense = MonthlyRollup.type == TransactionType.expense
+
+    monthly_rows = (
+        db.query(
+            MonthlyRollup.month,
+            func.sum(case((rollup_expense, 0), else_=MonthlyRollup.total)).label("income"),
+            func.sum(case((rollup_expense, MonthlyRollup.total), else_=0)).label("expense"),
+        )
+        .filter(*rollup_filters)
+        .group_by(MonthlyRollup.month)
+        .all()
+    )
+    by_month = {r.month: r for r in monthly_rows}
+    monthly = []
+    for m in range(1, 13):
+        row = by_month.get(m)
+        monthly.append(MonthlyTotals(
+            month=m,
+            income=row.income if row else 0.0,
+            expense=row.expense if row else 0.0,
+        ))
+
+    category_rows = (
+        db.query(
+            MonthlyRollup.category_id,
+            Category.name,
+            Category.color,
+            func.sum(MonthlyRollup.total).label("total"),
+        )
+        .outerjoin(Category, Category.id == MonthlyRollup.category_id)
+        .filter(*rollup_filters, rollup_expense)
+        .group_by(MonthlyRollup.category_id, Category.name, Category.color)
+        .having(func.sum(MonthlyRollup.count) > 0)
+        .order_by(func.sum(MonthlyRollup.total).desc())
+        .all()
+    )
+
+    # El rollup es mensual; la serie diaria se agrega sobre transactions (un año, indexado)
+    base_filters = (
+        Transaction.user_id == current_user.id,
+        Transaction.date >= date(year, 1, 1),
+        Transaction.date <= date(year, 12, 31),
+        Transaction.transfer_pair_id == None,
+    )
+    is_expense = Transaction.type == TransactionType.expense
+
+    daily_rows = (
+        db.query(Transaction.date, func.sum(Transaction.amount).label("total"))
+        .filter(*base_filters, is_expense)
+        .group_by(Transaction.date)
+        .order_by(Transaction.date)
+        .all()
+    )
+
+    return YearStatsOut(
+        year=year,
+        monthly=monthly,
+        expense_by_category=[
+            CategoryTotal(category_id=r.category_id, name=r.name, color=r.color, total=r.total)
+            for r in category_rows
+        ],
+        daily_expense=[DailySpend(date=r.date, total=r.total) for r in daily_rows],
+    )
@@ -1,164 +1,363 @@
-from datetime import date
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+import base64
+import json
+from datetime import date, datetime
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, Request, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.deps import get_db, get_current_user
+from app.database import AsyncSessionLocal
+from app.deps import get_async_db, get_current_user_async
 from app.models.account import Account, AccountType
 from app.models.transaction import Transaction, TransactionType
 from app.models.user import User
-from app.schemas.transaction import TransactionCreate, TransactionUpdate, TransactionOut, TransferCreate
+from app.schemas.transaction import ImportResult, TransactionCreate, TransactionUpdate, TransactionOut, TransferCreate
+from app.services.balances import balance_update
+from app.services.exports import EXPORT_MEDIA_TYPES, stream_export
+from app.services.imports import import_transactions
+from app.services.references import owned
+from app.services.rollups import rollup_entry, rollup_upsert
+from app.utils.cache import invalidate_dashboard
+from app.utils.etag import version_bump
+from app.utils.importers import ImportFormatError, parse_csv, parse_ofx
+from app.utils.retry import retry_on_conflict
+from app.utils.serialization import encoded_response
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 
 
-def _apply_balance(account: Account, tx_type: TransactionType, amount: float, reverse: bool = False):
-    """Update account balance based on transaction type and account type."""
-    multiplier = -1 if reverse else 1
-    if account.type == AccountType.debit:
-        if tx_type == TransactionType.expense:
-            account.balance -= amount * multiplier
-        else:
-            account.balance += amount * multiplier
-    else:  # credit
-        if tx_type == TransactionType.expense:
-            account.balance += amount * multiplier  # debt increases
-        else:
-            account.balance -= amount * multiplier  # debt decreases
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+STREAM_BATCH_SIZE = 500
+# El listado lee solo las columnas del schema: sin entidades en el identity map ni
+# validación por fila
+OUT_COLUMNS = [getattr(Transaction, name) for name in TransactionOut.model_fields]
 
 
-@router.get("", response_model=list[TransactionOut])
-def list_transactions(
-    from_date: date | None = Query(None, alias="from"),
-    to_date: date | None = Query(None, alias="to"),
+def _encode_cursor(tx: Transaction) -> str:
+    raw = json.dumps([tx.date.isoformat(), tx.created_at.isoformat(), tx.id])
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[date, datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        d, created, tx_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return date.fromisoformat(d), datetime.fromisoformat(created), int(tx_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _filtered_select(
+    user_id: int,
+    from_date: date | None = None,
+    to_date: date | None = None,
     category_id: int | None = None,
     type: TransactionType | None = None,
     account_id: int | None = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
-):
-    q = db.query(Transaction).filter(Transaction.user_id == current_user.id)
+    after: tuple[date, datetime, int] | None = None,
+) -> Select:
+    """Consulta base de transacciones del usuario con los filtros del listado, en orden estable."""
+    stmt = select(Transaction).where(Transaction.user_id == user_id)
     if from_date:
-        q = q.filter(Transaction.date >= from_date)
+        stmt = stmt.where(Transaction.date >= from_date)
     if to_date:
-        q = q.filter(Transaction.date <= to_date)
+        stmt = stmt.where(Transaction.date <= to_date)
     if category_id:
-        q = q.filter(Transaction.category_id == category_id)
+        stmt = stmt.where(Transaction.category_id == category_id)
     if type:
-        q = q.filter(Transaction.type == type)
+        stmt = stmt.where(Transaction.type == type)
     if account_id:
-        q = q.filter(Transaction.account_id == account_id)
-    return q.order_by(Transaction.date.desc(), Transaction.created_at.desc()).all()
+        stmt = stmt.where(Transaction.account_id == account_id)
+    if after:
+        stmt = stmt.where(tuple_(Transaction.date, Transaction.created_at, Transaction.id) < after)
+    # id desempata filas con misma fecha y created_at para que el keyset sea estable
+    return stmt.order_by(Transaction.date.desc(), Transaction.created_at.desc(), Transaction.id.desc())
+
+
+async def _stream_ndjson(stmt: Select):
+    """Emite filas como NDJSON desde un cursor del servidor; la memoria no crece con el historial.
+
+    Abre su propia sesión: la de `get_async_db` se cierra antes de que empiece el streaming.
+    """
+    async with AsyncSessionLocal() as db:
+        rows = await db.stream_scalars(stmt.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for tx in rows:
+            yield TransactionOut.model_validate(tx).model_dump_json() + "\n"
+
+
+async def _update_rollups(db: AsyncSession, added=(), removed=()) -> None:
+    """Aplica al rollup mensual los deltas de las transacciones escritas, en la misma transacción."""
+    stmt = rollup_upsert(added, removed)
+    if stmt is not None:
+        await db.execute(stmt)
+
+
+async def _update_balance(
+    db: AsyncSession,
+    account_id: int,
+    tx_type: TransactionType,
+    amount: float,
+    reverse: bool = False,
+    check_limit: bool = False,
+) -> None:
+    """Aplica el efecto de una transacción al saldo con un UPDATE atómico.
+
+    Con check_limit, si la cuenta crédito se quedaría sin cupo responde 400 con el
+    disponible actual (la transacción de la sesión se descarta). Si la cuenta ya no
+    existe responde 404.
+    """
+    stmt = balance_update(account_id, tx_type, amount, reverse=reverse, check_limit=check_limit)
+    if (await db.execute(stmt)).first() is not None:
+        return
+    account = (await db.execute(
+        select(Account.balance, Account.credit_limit).where(Account.id == account_id)
+    )).first()
+    if account is None:
+        # Borrada desde otra sesión después de validar la pertenencia
+        raise HTTPException(status_code=404, detail="Cuenta no encontrada")
+    raise HTTPException(status_code=400, detail=f"Cupo insuficiente. Disponible: {account.credit_limit - account.balance:.0f}")
+
+
+async def _owned_account(db: AsyncSession, account_id: int, user_id: int) -> dict:
+    account = await owned(db, user_id, "accounts", account_id)
+    if account is None:
+        raise HTTPException(status_code=404, detail="Cuenta no encontrada")
+    return account
+
+
+async def _check_category(db: AsyncSession, category_id: int | None, user_id: int) -> None:
+    if category_id is not None and await owned(db, user_id, "categories", category_id) is None:
+        raise HTTPException(status_code=404, detail="Categoría no encontrada")
+
+
+@router.get("", response_model=list[TransactionOut])
+async def list_transactions(
+    request: Request,
+    response: Response,
+    from_date: date | None = Query(None, alias="from"),
+    to_date: date | None = Query(None, alias="to"),
+    category_id: int | None = None,
+    type: TransactionType | None = None,
+    account_id: int | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(None, ge=1, le=1000),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    """Lista transacciones, opcionalmente paginadas por keyset sobre (date, created_at, id).
+
+    Con `limit`, el cursor de la siguiente página viaja en el header `X-Next-Cursor`
+    (ausente en la última página). Con `Accept: application/x-ndjson` la respuesta se
+    transmite fila a fila en lugar de construirse completa en memoria; con
+    `Accept: application/msgpack`, en MessagePack.
+    """
+    stmt = _filtered_select(
+        current_user.id,
+        from_date=from_date,
+        to_date=to_date,
+        category_id=category_id,
+        type=type,
+        account_id=account_id,
+        after=_decode_cursor(cursor) if cursor else None,
+    )
+
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        if limit:
+            stmt = stmt.limit(limit)
+        return StreamingResponse(_stream_ndjson(stmt), media_type=NDJSON_MEDIA_TYPE)
+
+    stmt = stmt.with_only_columns(*OUT_COLUMNS)
+    if limit is None:
+        rows = (await db.execute(stmt)).all()
+    else:
+        # Se pide una fila extra para saber si hay otra página sin un COUNT aparte
+        rows = (await db.execute(stmt.limit(limit + 1))).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            response.headers["X-Next-Cursor"] = _encode_cursor(rows[-1])
+    return encoded_response(request, response, list[TransactionOut], [row._asdict() for row in rows], trusted=True)
+
+
+@router.get("/export")
+async def export_transactions(
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"),
+    from_date: date | None = Query(None, alias="from"),
+    to_date: date | None = Query(None, alias="to"),
+    category_id: int | None = None,
+    type: TransactionType | None = None,
+    account_id: int | None = None,
+    current_user: User = Depends(get_current_user_async),
+):
+    """Exporta las transacciones filtradas (mismos filtros que el listado) como descarga."""
+    if format == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="La exportación Parquet no está disponible")
+    stmt = _filtered_select(
+        current_user.id,
+        from_date=from_date,
+        to_date=to_date,
+        category_id=category_id,
+        type=type,
+        account_id=account_id,
+    )
+    return StreamingResponse(
+        stream_export(stmt, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="transacciones.{format}"'},
+    )
 
 
 @router.post("", response_model=TransactionOut, status_code=201)
-def create_transaction(
+@retry_on_conflict
+async def create_transaction(
     data: TransactionCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
 ):
-    account = db.query(Account).filter(Account.id == data.account_id, Account.user_id == current_user.id).first()
-    if not account:
-        raise HTTPException(status_code=404, detail="Cuenta no encontrada")
-    if (account.type == AccountType.credit
-            and data.type == TransactionType.expense
-            and account.credit_limit is not None
-            and account.balance + data.amount > account.credit_limit):
-        raise HTTPException(status_code=400, detail=f"Cupo insuficiente. Disponible: {account.credit_limit - account.balance:.0f}")
+    await _owned_account(db, data.account_id, current_user.id)
+    await _check_category(db, data.category_id, current_user.id)
+    await _update_balance(db, data.account_id, data.type, data.amount, check_limit=True)
     tx = Transaction(**data.model_dump(), user_id=current_user.id)
-    _apply_balance(account, data.type, data.amount)
     db.add(tx)
-    db.commit()
-    db.refresh(tx)
+    await _update_rollups(db, added=[tx])
+    await db.execute(version_bump(current_user.id, "accounts"))
+    await db.commit()
+    invalidate_dashboard(current_user.id)
+    await db.refresh(tx)
     return tx
 
 
+@router.post("/import", response_model=ImportResult)
+async def import_transactions_file(
+    file: UploadFile = File(...),
+    account_id: int | None = Form(None),
+    format: str | None = Form(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    """Importa un extracto CSV u OFX. Las filas válidas se guardan; las inválidas se reportan.
+
+    `account_id` se usa para las filas sin cuenta (siempre en OFX). El formato se deduce
+    de la extensión si no se indica.
+    """
+    ext = file.filename.rsplit(".", 1)[-1] if file.filename and "." in file.filename else "csv"
+    fmt = (format or ext).lower()
+    if fmt not in ("csv", "ofx", "qfx"):
+        raise HTTPException(status_code=400, detail="Formato no soportado, use CSV u OFX")
+    parser = parse_csv if fmt == "csv" else parse_ofx
+    try:
+        result = await import_transactions(db, current_user.id, parser(file.file, account_id))
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result.imported:
+        await db.execute(version_bump(current_user.id, "accounts"))
+    await db.commit()
+    if result.imported:
+        invalidate_dashboard(current_user.id)
+    return result
+
+
 @router.put("/{tx_id}", response_model=TransactionOut)
-def update_transaction(
+@retry_on_conflict
+async def update_transaction(
     tx_id: int,
     data: TransactionUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
 ):
-    tx = db.query(Transaction).filter(Transaction.id == tx_id, Transaction.user_id == current_user.id).first()
+    tx = await db.scalar(select(Transaction).where(Transaction.id == tx_id, Transaction.user_id == current_user.id))
     if not tx:
         raise HTTPException(status_code=404, detail="Transacción no encontrada")
-
-    # Reverse old balance on old account
-    old_account = db.query(Account).filter(Account.id == tx.account_id).first()
-    if old_account:
-        _apply_balance(old_account, tx.type, tx.amount, reverse=True)
+    if data.account_id is not None:
+        await _owned_account(db, data.account_id, current_user.id)
+    await _check_category(db, data.category_id, current_user.id)
+    before = rollup_entry(tx)
+    old_account_id, old_type, old_amount = tx.account_id, tx.type, tx.amount
 
     # Apply updated fields to transaction
     update_data = data.model_dump(exclude_none=True)
     for field, value in update_data.items():
         setattr(tx, field, value)
 
-    # Apply new balance on new account (may be different from old)
-    new_account = db.query(Account).filter(Account.id == tx.account_id).first()
-    if new_account:
-        if (new_account.type == AccountType.credit
-                and tx.type == TransactionType.expense
-                and new_account.credit_limit is not None
-                and new_account.balance + tx.amount > new_account.credit_limit):
-            raise HTTPException(status_code=400, detail=f"Cupo insuficiente. Disponible: {new_account.credit_limit - new_account.balance:.0f}")
-        _apply_balance(new_account, tx.type, tx.amount)
-
-    db.commit()
-    db.refresh(tx)
+    # Cuentas en orden de id para no cruzar locks con otra escritura concurrente; en la
+    # misma cuenta se revierte primero para validar el cupo sin esta transacción
+    if old_account_id <= tx.account_id:
+        await _update_balance(db, old_account_id, old_type, old_amount, reverse=True)
+        await _update_balance(db, tx.account_id, tx.type, tx.amount, check_limit=True)
+    else:
+        await _update_balance(db, tx.account_id, tx.type, tx.amount, check_limit=True)
+        await _update_balance(db, old_account_id, old_type, old_amount, reverse=True)
+
+    await _update_rollups(db, added=[tx], removed=[before])
+    await db.execute(version_bump(current_user.id, "accounts"))
+    await db.commit()
+    invalidate_dashboard(current_user.id)
+    await db.refresh(tx)
     return tx
 
 
 @router.delete("/{tx_id}", status_code=204)
-def delete_transaction(tx_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    tx = db.query(Transaction).filter(Transaction.id == tx_id, Transaction.user_id == current_user.id).first()
+@retry_on_conflict
+async def delete_transaction(
+    tx_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
+):
+    tx = await db.scalar(select(Transaction).where(Transaction.id == tx_id, Transaction.user_id == current_user.id))
     if not tx:
         raise HTTPException(status_code=404, detail="Transacción no encontrada")
 
     # Si es parte de una transferencia, obtener el par antes de tocar nada
     pair = None
     if tx.transfer_pair_id:
-        pair = db.query(Transaction).filter(Transaction.id == tx.transfer_pair_id).first()
+        pair = await db.get(Transaction, tx.transfer_pair_id)
+    # Claves del rollup antes de romper el vínculo de la transferencia
+    removed = [rollup_entry(t) for t in (tx, pair) if t]
 
-    # Revertir saldo de esta transacción
-    account = db.query(Account).filter(Account.id == tx.account_id).first()
-    if account:
-        _apply_balance(account, tx.type, tx.amount, reverse=True)
+    # Revertir saldos (el del par también), en orden de cuenta
+    for t in sorted((t for t in (tx, pair) if t), key=lambda t: t.account_id):
+        await _update_balance(db, t.account_id, t.type, t.amount, reverse=True)
 
-    # Revertir saldo del par y romper la FK circular antes de borrar
+    # Romper la FK circular antes de borrar
     if pair:
-        pair_account = db.query(Account).filter(Account.id == pair.account_id).first()
-        if pair_account:
-            _apply_balance(pair_account, pair.type, pair.amount, reverse=True)
         pair.transfer_pair_id = None
-
     tx.transfer_pair_id = None
-    db.flush()
+    await db.flush()
 
     if pair:
-        db.delete(pair)
-    db.delete(tx)
-    db.commit()
+        await db.delete(pair)
+    await db.delete(tx)
+    await _update_rollups(db, removed=removed)
+    await db.execute(version_bump(current_user.id, "accounts"))
+    await db.commit()
+    invalidate_dashboard(current_user.id)
 
 
 @router.post("/transfer", response_model=list[TransactionOut], status_code=201)
-def create_transfer(
+@retry_on_conflict
+async def create_transfer(
     data: TransferCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user_async),
 ):
-    from_account = db.query(Account).filter(Account.id == data.from_account_id, Account.user_id == current_user.id).first()
-    to_account = db.query(Account).filter(Account.id == data.to_account_id, Account.user_id == current_user.id).first()
-    if not from_account or not to_account:
-        raise HTTPException(status_code=404, detail="Cuenta no encontrada")
+    if data.from_account_id == data.to_account_id:
+        raise HTTPException(status_code=400, detail="La cuenta origen y la cuenta destino deben ser distintas")
+    from_account = await _owned_account(db, data.from_account_id, current_user.id)
+    to_account = await _owned_account(db, data.to_account_id, current_user.id)
 
-    # Para cuentas débito, verificar saldo suficiente
-    if from_account.type == AccountType.debit and from_account.balance < data.amount:
-        raise HTTPException(status_code=400, detail="Saldo insuficiente en la cuenta origen")
-    # Para cuentas crédito, verificar cupo disponible
-    if (from_account.type == AccountType.credit
-            and from_account.credit_limit is not None
-            and from_account.balance + data.amount > from_account.credit_limit):
-        raise HTTPException(status_code=400, detail=f"Cupo insuficiente. Disponible: {from_account.credit_limit - from_account.balance:.0f}")
+    # Saldo suficiente (débito) o cupo disponible (crédito) se validan en el mismo UPDATE;
+    # las dos cuentas se actualizan en orden de id
+    for account_id in sorted((data.from_account_id, data.to_account_id)):
+        if account_id == data.to_account_id:
+            await _update_balance(db, to_account["id"], TransactionType.income, data.amount)
+        elif from_account["type"] == AccountType.debit:
+            stmt = balance_update(from_account["id"], TransactionType.expense, data.amount, check_funds=True)
+            if (await db.execute(stmt)).first() is None:
+                raise HTTPException(status_code=400, detail="Saldo insuficiente en la cuenta origen")
+        else:
+            await _update_balance(db, from_account["id"], TransactionType.expense, data.amount, check_limit=True)
 
     tx_out = Transaction(
         user_id=current_user.id,
@@ -166,7 +365,7 @@ def create_transfer(
         type=TransactionType.expense,
         amount=data.amount,
         date=data.date,
-        description=data.description or f"Transferencia a {to_account.name}",
+        description=data.description or f"Transferencia a {to_account['name']}",
     )
     tx_in = Transaction(
         user_id=current_user.id,
@@ -174,19 +373,19 @@ def create_transfer(
         type=TransactionType.income,
         amount=data.amount,
         date=data.date,
-        description=data.description or f"Transferencia desde {from_account.name}",
+        description=data.description or f"Transferencia desde {from_account['name']}",
     )
     db.add(tx_out)
     db.add(tx_in)
-    db.flush()
+    await db.flush()
 
     tx_out.transfer_pair_id = tx_in.id
     tx_in.transfer_pair_id = tx_out.id
 
-    _apply_balance(from_account, TransactionType.expense, data.amount)
-    _apply_balance(to_account, TransactionType.income, data.amount)
-
-    db.commit()
-    db.refresh(tx_out)
-    db.refresh(tx_in)
+    await _update_rollups(db, added=[tx_out, tx_in])
+    await db.execute(version_bump(current_user.id, "accounts"))
+    await db.commit()
+    invalidate_dashboard(current_user.id)
+    await db.refresh(tx_out)
+    await db.refresh(tx_in)
     return [tx_out, tx_in]
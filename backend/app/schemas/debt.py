@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from datetime import date as DateType, datetime
+from typing import Literal
 from app.models.debt import DebtType, DebtStatus
 
 
@@ -38,6 +39,66 @@ class DebtPaymentOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class AmortizationRow(BaseModel):
+    period: int
+    date: DateType
+    payment: float
+    interest: float
+    principal: float
+    remaining: float
+
+
+class DebtScheduleOut(BaseModel):
+    debt_id: int
+    balance: float
+    interest_rate: float
+    payment: float | None  # cuota mensual; None si no hay recurrente vinculado ni fecha estimada
+    payment_source: Literal["recurring", "end_date"] | None
+    periods: int
+    payoff_date: DateType | None  # None si la cuota no alcanza a saldarla en el horizonte
+    total_interest: float
+    rows: list[AmortizationRow]
+
+
+class PayoffStrategyRequest(BaseModel):
+    monthly_budget: float
+    # Orden propio de prioridad (ids de deudas); las que falten van al final
+    custom_order: list[int] | None = None
+
+
+class StrategyDebt(BaseModel):
+    debt_id: int
+    counterpart_name: str
+    balance: float
+    interest_rate: float
+    minimum_payment: float  # recurrentes vinculados, llevados a equivalente mensual
+
+
+class StrategyMonth(BaseModel):
+    period: int
+    date: DateType
+    payments: dict[int, float]  # debt_id → abono del mes
+    interest: float
+    remaining: float
+
+
+class StrategyResult(BaseModel):
+    strategy: Literal["avalanche", "snowball", "custom"]
+    order: list[int]
+    months: int | None  # None si no se salda todo dentro del horizonte
+    payoff_date: DateType | None
+    total_interest: float
+    total_paid: float
+    debt_payoff_dates: dict[int, DateType | None]
+    schedule: list[StrategyMonth]
+
+
+class PayoffStrategyOut(BaseModel):
+    monthly_budget: float
+    debts: list[StrategyDebt]
+    strategies: list[StrategyResult]
+
+
 class DebtOut(BaseModel):
     id: int
     user_id: int
@@ -0,0 +1,23 @@
+from pydantic import BaseModel
+from datetime import date as DateType
+from app.models.account import AccountType
+
+
+class AccountForecast(BaseModel):
+    account_id: int
+    name: str
+    type: AccountType
+    credit_limit: float | None
+    balances: list[float]  # un saldo por día, alineado con ForecastOut.dates
+    # Primer día en que una cuenta débito queda en negativo o una de crédito supera su cupo
+    first_shortfall: DateType | None
+
+
+class ForecastOut(BaseModel):
+    start: DateType
+    days: int
+    dates: list[DateType]
+    accounts: list[AccountForecast]
+    # Débito menos crédito, incluyendo cuotas de metas y planes de deuda sin cuenta
+    total: list[float]
+    total_first_negative: DateType | None
@@ -26,6 +26,16 @@ class RecurringUpdate(BaseModel):
     debt_id: int | None = None
 
 
+class RecurringOccurrence(BaseModel):
+    date: date
+    recurring_id: int
+    name: str
+    amount: float
+    account_id: int
+    category_id: int | None
+    debt_id: int | None
+
+
 class RecurringOut(BaseModel):
     id: int
     user_id: int
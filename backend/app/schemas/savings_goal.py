@@ -52,10 +52,10 @@ class GoalOut(BaseModel):
     color: str
     status: WishlistStatus
     created_at: datetime
-    contributions: list[ContributionOut] = []
+    current_amount: float = 0.0
+    contribution_count: int = 0
 
     # campos calculados
-    current_amount: float = 0.0
     remaining_amount: float = 0.0
     estimated_date: Optional[DateType] = None
     estimated_months: Optional[float] = None
@@ -0,0 +1,27 @@
+from pydantic import BaseModel
+from datetime import date as DateType
+
+
+class MonthlyTotals(BaseModel):
+    month: int
+    income: float
+    expense: float
+
+
+class CategoryTotal(BaseModel):
+    category_id: int | None
+    name: str | None
+    color: str | None
+    total: float
+
+
+class DailySpend(BaseModel):
+    date: DateType
+    total: float
+
+
+class YearStatsOut(BaseModel):
+    year: int
+    monthly: list[MonthlyTotals]
+    expense_by_category: list[CategoryTotal]
+    daily_expense: list[DailySpend]
@@ -42,3 +42,21 @@ class TransactionOut(BaseModel):
     created_at: datetime
 
     model_config = {"from_attributes": True}
+
+
+class ImportRowError(BaseModel):
+    row: int
+    error: str
+
+
+class ImportAccountError(BaseModel):
+    account_id: int
+    rows: int
+    error: str
+
+
+class ImportResult(BaseModel):
+    imported: int
+    error_count: int
+    errors: list[ImportRowError]
+    account_errors: list[ImportAccountError] = []
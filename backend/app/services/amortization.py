@@ -0,0 +1,175 @@
+"""Tablas de amortización de deudas con interés, calculadas en bloque con NumPy.
+
+`interest_rate` es una tasa mensual en porcentaje. Cada deuda activa se proyecta mes a
+mes desde hoy con una cuota fija:
+
+- la suma de los recurrentes activos vinculados a la deuda, llevada a equivalente mensual;
+- si no hay recurrentes y la deuda tiene `estimated_end_date`, la cuota de una anualidad
+  que la salda en esa fecha;
+- sin ninguna de las dos no hay cuota y la deuda no tiene tabla.
+
+El saldo tras k cuotas tiene forma cerrada, B·(1+r)^k − P·((1+r)^k − 1)/r (o B − k·P sin
+interés), así que todas las deudas del usuario se calculan como una matriz deudas × periodos
+sin iterar mes a mes. La tabla termina al saldarse la deuda o en `estimated_end_date`.
+"""
+from datetime import date
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.debt import Debt, DebtStatus
+from app.models.recurring import Frequency, RecurringExpense
+from app.utils.cache import debt_schedule_cache
+
+# Ocurrencias por mes de cada frecuencia
+MONTHLY_FACTOR = {
+    Frequency.daily: 365 / 12,
+    Frequency.weekly: 52 / 12,
+    Frequency.biweekly: 26 / 12,
+    Frequency.monthly: 1.0,
+    Frequency.yearly: 1 / 12,
+}
+
+
+def _months_until(start: date, end: date) -> int:
+    """Cuotas mensuales desde el mes siguiente a `start` hasta `end` (al menos una)."""
+    return max((end.year - start.year) * 12 + end.month - start.month, 1)
+
+
+def _annuity(balance: np.ndarray, rate: np.ndarray, periods: np.ndarray) -> np.ndarray:
+    """Cuota fija que salda `balance` en `periods` meses a la tasa mensual `rate`."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        with_interest = balance * rate / (1 - (1 + rate) ** -periods)
+    return np.where(rate > 0, with_interest, balance / periods)
+
+
+def amortization_tables(
+    balance: np.ndarray,
+    rate: np.ndarray,
+    payment: np.ndarray,
+    periods: np.ndarray,
+    max_periods: int,
+) -> dict[str, np.ndarray]:
+    """Tablas de amortización de varias deudas a la vez.
+
+    Recibe vectores de largo D (saldo, tasa mensual en fracción, cuota y número máximo de
+    cuotas de cada deuda) y devuelve matrices D × max_periods con la cuota, el interés, el
+    abono a capital y el saldo restante de cada periodo, más `mask` (periodos vigentes:
+    hasta la cuota que salda la deuda o hasta su tope de cuotas).
+    """
+    k = np.arange(1, max_periods + 1)
+    b, r, p = balance[:, None], rate[:, None], payment[:, None]
+    growth = (1 + r) ** k
+    with np.errstate(divide="ignore", invalid="ignore"):
+        paid = np.where(r > 0, p * (growth - 1) / r, p * k)
+    remaining = b * growth - paid
+
+    # Saldo al inicio de cada periodo: B para el primero, el restante del anterior después
+    opening = np.concatenate([b, remaining[:, :-1]], axis=1)
+    interest = opening * r
+    # La última cuota solo cubre lo que queda
+    installment = np.minimum(p, opening + interest)
+    settled = remaining < 0.005  # medio centavo: errores de redondeo de la forma cerrada
+    payoff = np.where(settled.any(axis=1), settled.argmax(axis=1) + 1, max_periods + 1)
+    last = np.minimum(payoff, periods)
+    mask = k <= last[:, None]
+    return {
+        "payment": installment,
+        "interest": interest,
+        "principal": installment - interest,
+        "remaining": np.maximum(remaining, 0),
+        "mask": mask,
+        "payoff_period": np.where(payoff <= periods, payoff, 0),
+    }
+
+
+def linked_monthly_payments(db: Session, user_id: int) -> dict[int, float]:
+    """Cuota mensual equivalente de los recurrentes activos vinculados a cada deuda."""
+    rows = db.execute(
+        select(RecurringExpense.debt_id, RecurringExpense.amount, RecurringExpense.frequency).where(
+            RecurringExpense.user_id == user_id,
+            RecurringExpense.is_active.is_(True),
+            RecurringExpense.debt_id.is_not(None),
+        )
+    )
+    payments: dict[int, float] = {}
+    for debt_id, amount, frequency in rows:
+        payments[debt_id] = payments.get(debt_id, 0.0) + amount * MONTHLY_FACTOR[frequency]
+    return payments
+
+
+def compute_schedules(db: Session, user_id: int, today: date) -> dict[int, dict]:
+    """Tablas de amortización de todas las deudas activas del usuario, por debt_id."""
+    debts = db.scalars(
+        select(Debt).where(
+            Debt.user_id == user_id,
+            Debt.status == DebtStatus.active,
+            Debt.remaining_amount > 0,
+        ).order_by(Debt.id)
+    ).all()
+    linked = linked_monthly_payments(db, user_id)
+    schedules = {}
+    rows = []
+    for debt in debts:
+        periods = settings.amortization_max_periods
+        if debt.estimated_end_date and debt.estimated_end_date > today:
+            periods = min(_months_until(today, debt.estimated_end_date), periods)
+        if debt.id in linked:
+            source = "recurring"
+        elif debt.estimated_end_date and debt.estimated_end_date > today:
+            source = "end_date"
+        else:
+            source = None
+        schedules[debt.id] = {
+            "debt_id": debt.id,
+            "balance": debt.remaining_amount,
+            "interest_rate": debt.interest_rate or 0.0,
+            "payment": None,
+            "payment_source": source,
+            "periods": 0,
+            "payoff_date": None,
+            "total_interest": 0.0,
+            "rows": [],
+        }
+        if source:
+            monthly_rate = (debt.interest_rate or 0) / 100
+            rows.append((debt.id, debt.remaining_amount, monthly_rate, linked.get(debt.id, 0.0), periods, source == "end_date"))
+    if not rows:
+        return schedules
+
+    ids, balance, rate, linked_payment, periods, by_end_date = (np.array(column) for column in zip(*rows))
+    balance, rate, linked_payment, periods = (a.astype(float) for a in (balance, rate, linked_payment, periods))
+    payment = np.where(by_end_date, _annuity(balance, rate, periods), linked_payment)
+    max_periods = int(periods.max())
+    tables = amortization_tables(balance, rate, payment, periods, max_periods)
+
+    dates = [today + relativedelta(months=k) for k in range(1, max_periods + 1)]
+    for i, debt_id in enumerate(ids.tolist()):
+        n = int(tables["mask"][i].sum())
+        payoff = int(tables["payoff_period"][i])
+        schedule = schedules[debt_id]
+        schedule["payment"] = round(float(payment[i]), 2)
+        schedule["periods"] = n
+        schedule["payoff_date"] = dates[payoff - 1] if payoff else None
+        schedule["total_interest"] = round(float(tables["interest"][i, :n].sum()), 2)
+        columns = [np.round(tables[name][i, :n], 2).tolist() for name in ("payment", "interest", "principal", "remaining")]
+        schedule["rows"] = [
+            {"period": k + 1, "date": dates[k], "payment": pay, "interest": interest, "principal": principal, "remaining": rem}
+            for k, (pay, interest, principal, rem) in enumerate(zip(*columns))
+        ]
+    return schedules
+
+
+def debt_schedules(db: Session, user_id: int) -> dict[int, dict]:
+    """Tablas del usuario desde el cache; se recalculan si cambió una deuda, un abono o el día."""
+    today = date.today()
+    cached = debt_schedule_cache.get(user_id)
+    if cached and cached[0] == today:
+        return cached[1]
+    epoch = debt_schedule_cache.epoch
+    schedules = compute_schedules(db, user_id, today)
+    debt_schedule_cache.set(user_id, (today, schedules), epoch=epoch)
+    return schedules
@@ -0,0 +1,60 @@
+"""Cambios de saldo atómicos en SQL.
+
+`balance_update` arma un único `UPDATE accounts SET balance = balance + delta ...
+RETURNING balance`: el delta depende del tipo de cuenta (en débito los ingresos suman
+y los gastos restan; en crédito la deuda sube con los gastos) y las validaciones de
+saldo suficiente y cupo van en el WHERE. Si la validación no se cumple no se actualiza
+ninguna fila y la sentencia no devuelve nada. Dos escrituras concurrentes sobre la
+misma cuenta ya no pierden actualizaciones: Postgres serializa solo esa fila durante
+el UPDATE, sin locks explícitos ni lecturas previas.
+
+Cuando una operación toca varias cuentas, las actualizaciones deben ir en orden de
+`account_id` para que dos transacciones no se bloqueen mutuamente.
+"""
+from sqlalchemy import Update, case, or_, update
+
+from app.models.account import Account, AccountType
+from app.models.transaction import TransactionType
+
+
+def balance_delta(tx_type: TransactionType, amount: float, reverse: bool = False):
+    """Expresión SQL del cambio de saldo de una transacción sobre la cuenta de la fila."""
+    signed = amount if tx_type == TransactionType.income else -amount
+    if reverse:
+        signed = -signed
+    return case((Account.type == AccountType.debit, signed), else_=-signed)
+
+
+def balance_update(
+    account_id: int,
+    tx_type: TransactionType,
+    amount: float,
+    *,
+    reverse: bool = False,
+    user_id: int | None = None,
+    check_funds: bool = False,
+    check_limit: bool = False,
+) -> Update:
+    """UPDATE atómico del saldo; devuelve el saldo nuevo o ninguna fila si no pasa las validaciones.
+
+    check_funds: una cuenta débito no puede quedar en negativo.
+    check_limit: una cuenta crédito no puede superar su cupo (si lo tiene).
+    """
+    new_balance = Account.balance + balance_delta(tx_type, amount, reverse)
+    stmt = update(Account).where(Account.id == account_id)
+    if user_id is not None:
+        stmt = stmt.where(Account.user_id == user_id)
+    if check_funds:
+        stmt = stmt.where(or_(Account.type != AccountType.debit, new_balance >= 0))
+    if check_limit:
+        stmt = stmt.where(or_(
+            Account.type != AccountType.credit,
+            Account.credit_limit.is_(None),
+            new_balance <= Account.credit_limit,
+        ))
+    # fetch: los objetos Account ya cargados en la sesión quedan con el saldo nuevo
+    return (
+        stmt.values(balance=new_balance)
+        .returning(Account.balance)
+        .execution_options(synchronize_session="fetch")
+    )
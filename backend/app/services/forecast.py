@@ -0,0 +1,133 @@
+"""Proyección diaria de saldos por cuenta a partir de los movimientos programados.
+
+Parte del saldo actual de cada cuenta y suma, día a día, los movimientos conocidos:
+
+- ocurrencias de los recurrentes activos (gastos en su cuenta); las vencidas que el motor
+  aún no registró cuentan hoy;
+- planes de pago de deudas con fecha estimada (tabla de amortización) cuando tienen cuenta:
+  lo que me deben entra a la cuenta de la que salió el préstamo. Las deudas con recurrente
+  vinculado ya están en los recurrentes;
+- cuotas de metas de ahorro y planes de deudas sin cuenta: no se sabe de qué cuenta salen,
+  así que solo afectan la posición total.
+
+Los movimientos se acumulan en una matriz cuentas × días con `np.add.at` y el saldo es la
+suma acumulada sobre los días; no hay un recorrido día a día.
+"""
+import math
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.account import Account, AccountType
+from app.models.debt import Debt, DebtType
+from app.models.recurring import Frequency, RecurringExpense
+from app.models.savings_goal import SavingsGoal, WishlistStatus
+from app.services.amortization import debt_schedules
+from app.services.recurrence import expand, expand_many
+
+
+def _first_day(mask: np.ndarray, dates: list[date]) -> list[date | None]:
+    """Primer día en que se cumple `mask` (filas × días), o None por fila."""
+    hit = mask.any(axis=1)
+    first = mask.argmax(axis=1)
+    return [dates[i] if h else None for h, i in zip(hit.tolist(), first.tolist())]
+
+
+def forecast(db: Session, user_id: int, days: int) -> dict:
+    """Saldos proyectados de hoy a `days` días, por cuenta y total, con el primer día en rojo."""
+    today = date.today()
+    end = today + timedelta(days=days)
+    dates = [today + timedelta(days=i) for i in range(days + 1)]
+    origin = np.datetime64(today, "D")
+
+    accounts = db.scalars(select(Account).where(Account.user_id == user_id).order_by(Account.id)).all()
+    index = {a.id: i for i, a in enumerate(accounts)}
+    # Efecto en el saldo de un ingreso de 1: suma en débito, baja la deuda en crédito
+    income_sign = np.array([1.0 if a.type == AccountType.debit else -1.0 for a in accounts])
+    flows = np.zeros((len(accounts), days + 1))
+    # Flujo neto sin cuenta asignada (positivo = entra dinero)
+    unassigned = np.zeros(days + 1)
+
+    def add(account_id: int | None, when: np.ndarray, amounts: np.ndarray | float) -> None:
+        day = np.clip((when - origin).astype(int), 0, None)
+        if account_id is None:
+            np.add.at(unassigned, day, amounts)
+        elif account_id in index:
+            row = index[account_id]
+            np.add.at(flows[row], day, income_sign[row] * np.asarray(amounts))
+
+    recurring = db.scalars(
+        select(RecurringExpense).where(RecurringExpense.user_id == user_id, RecurringExpense.is_active.is_(True))
+    ).all()
+    recurring = [r for r in recurring if r.account_id in index]
+    if recurring:
+        series, when = expand_many(
+            [r.next_date for r in recurring], [r.frequency for r in recurring],
+            min(r.next_date for r in recurring), end,
+        )
+        row = np.array([index[r.account_id] for r in recurring])[series]
+        amount = np.array([r.amount for r in recurring])[series]
+        day = np.clip((when - origin).astype(int), 0, None)
+        np.add.at(flows, (row, day), -amount * income_sign[row])
+
+    # Planes de pago por fecha estimada; los de recurrentes vinculados ya se sumaron arriba
+    schedules = debt_schedules(db, user_id)
+    planned = [s for s in schedules.values() if s["payment_source"] == "end_date" and s["rows"]]
+    if planned:
+        debts = {d.id: d for d in db.scalars(select(Debt).where(Debt.id.in_([s["debt_id"] for s in planned])))}
+        for s in planned:
+            debt = debts[s["debt_id"]]
+            rows = [row for row in s["rows"] if row["date"] <= end]
+            if not rows:
+                continue
+            when = np.array([row["date"] for row in rows], dtype="datetime64[D]")
+            amounts = np.array([row["payment"] for row in rows])
+            if debt.type == DebtType.owed:
+                add(debt.account_id, when, amounts)
+            else:
+                add(None, when, -amounts)
+
+    goals = db.scalars(
+        select(SavingsGoal).where(
+            SavingsGoal.user_id == user_id,
+            SavingsGoal.status == WishlistStatus.active,
+            SavingsGoal.quota_amount > 0,
+            SavingsGoal.current_amount < SavingsGoal.target_amount,
+        )
+    ).all()
+    for g in goals:
+        # Cuotas con el calendario de la meta (desde su creación), solo las que faltan
+        remaining_quotas = math.ceil((g.target_amount - g.current_amount) / g.quota_amount)
+        when = expand(g.created_at.date(), Frequency(g.frequency.value), end)
+        when = when[when > origin][:remaining_quotas]
+        add(None, when, -g.quota_amount)
+
+    opening = np.array([a.balance for a in accounts], dtype=float)
+    balances = opening[:, None] + np.cumsum(flows, axis=1)
+    is_debit = np.array([a.type == AccountType.debit for a in accounts], dtype=bool)
+    limit = np.array([a.credit_limit if a.credit_limit is not None else np.inf for a in accounts], dtype=float)
+    shortfall = np.where(is_debit[:, None], balances < 0, balances > limit[:, None])
+    first_shortfall = _first_day(shortfall, dates)
+
+    # Posición total: lo disponible en débito menos lo adeudado en crédito
+    total = (balances * np.where(is_debit, 1.0, -1.0)[:, None]).sum(axis=0) + np.cumsum(unassigned)
+    return {
+        "start": today,
+        "days": days,
+        "dates": dates,
+        "accounts": [
+            {
+                "account_id": a.id,
+                "name": a.name,
+                "type": a.type,
+                "credit_limit": a.credit_limit,
+                "balances": np.round(balances[i], 2).tolist(),
+                "first_shortfall": first_shortfall[i],
+            }
+            for i, a in enumerate(accounts)
+        ],
+        "total": np.round(total, 2).tolist(),
+        "total_first_negative": _first_day((total < 0)[None, :], dates)[0],
+    }
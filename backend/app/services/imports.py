@@ -0,0 +1,144 @@
+"""Importación masiva de transacciones desde CSV/OFX.
+
+Las filas se parsean y validan por lotes en el threadpool (el archivo no se carga
+completo) y se cargan con COPY a una tabla temporal. Desde ahí un solo INSERT ...
+SELECT crea las transacciones, el saldo de cada cuenta recibe un único delta neto
+(con la validación de cupo de POST /transactions) y el rollup mensual se
+actualiza agrupando el staging. Todo en la transacción de la
+sesión: si algo falla no queda nada a medias.
+"""
+from datetime import datetime
+from itertools import islice
+from typing import Iterator
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import Column, Date, Float, Integer, MetaData, String, Table, case, cast, delete, func, insert, literal, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.transaction import Transaction, TransactionType
+from app.schemas.transaction import ImportAccountError, ImportResult, ImportRowError, TransactionCreate
+from app.services.balances import balance_update
+from app.services.references import reference_rows
+from app.services.rollups import rollup_upsert_from
+from app.utils.importers import ROW_ERROR, ImportFormatError
+
+IMPORT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+staging = Table(
+    "import_staging",
+    MetaData(),
+    Column("account_id", Integer),
+    Column("category_id", Integer),
+    Column("type", String),
+    Column("amount", Float),
+    Column("date", Date),
+    Column("description", String),
+)
+STAGING_COLUMNS = [c.name for c in staging.columns]
+
+
+def _validate_batch(
+    rows: Iterator[tuple[int, dict]],
+    account_ids: set[int],
+    category_ids: set[int],
+) -> tuple[int, list[tuple], list[ImportRowError]]:
+    """Siguiente lote: (filas leídas, registros para COPY, errores por fila)."""
+    records, errors = [], []
+    read = 0
+    for row_no, raw in islice(rows, IMPORT_BATCH_SIZE):
+        read += 1
+        if ROW_ERROR in raw:
+            errors.append(ImportRowError(row=row_no, error=raw[ROW_ERROR]))
+            continue
+        try:
+            data = TransactionCreate.model_validate(raw)
+        except ValidationError as e:
+            detail = "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+            errors.append(ImportRowError(row=row_no, error=detail))
+            continue
+        if data.account_id not in account_ids:
+            errors.append(ImportRowError(row=row_no, error="Cuenta no encontrada"))
+            continue
+        if data.category_id is not None and data.category_id not in category_ids:
+            errors.append(ImportRowError(row=row_no, error="Categoría no encontrada"))
+            continue
+        if data.amount <= 0:
+            errors.append(ImportRowError(row=row_no, error="El monto debe ser mayor a 0"))
+            continue
+        records.append((
+            data.account_id, data.category_id, data.type.value, data.amount, data.date, data.description,
+        ))
+    return read, records, errors
+
+
+async def import_transactions(db: AsyncSession, user_id: int, rows: Iterator[tuple[int, dict]]) -> ImportResult:
+    """Importa las filas válidas y reporta las inválidas. No hace commit.
+
+    `error_count` incluye las filas de las cuentas rechazadas en `account_errors`.
+    """
+    account_ids = set(await reference_rows(db, user_id, "accounts"))
+    category_ids = set(await reference_rows(db, user_id, "categories"))
+
+    await db.execute(text(
+        "CREATE TEMP TABLE import_staging ("
+        "account_id integer, category_id integer, type text, amount double precision, "
+        "date date, description text) ON COMMIT DROP"
+    ))
+    conn = await db.connection()
+    driver = (await conn.get_raw_connection()).driver_connection
+
+    total_read, error_count = 0, 0
+    errors: list[ImportRowError] = []
+    while True:
+        read, records, batch_errors = await run_in_threadpool(_validate_batch, rows, account_ids, category_ids)
+        if not read:
+            break
+        total_read += read
+        if total_read > settings.import_max_rows:
+            raise ImportFormatError(f"El archivo supera el máximo de {settings.import_max_rows} filas")
+        error_count += len(batch_errors)
+        errors.extend(batch_errors[:MAX_REPORTED_ERRORS - len(errors)])
+        if records:
+            await driver.copy_records_to_table("import_staging", records=records, columns=STAGING_COLUMNS)
+
+    # Un delta neto por cuenta: el cambio de saldo es lineal en el monto, así que
+    # ingresos - gastos aplicado como "ingreso" deja el mismo saldo que fila a fila. Si el
+    # neto es de gasto se valida el cupo como en POST /transactions (una cuenta débito
+    # puede quedar en negativo); las cuentas que no pasan no importan ninguna de sus filas.
+    net_income = func.sum(
+        case((staging.c.type == TransactionType.income.value, staging.c.amount), else_=-staging.c.amount)
+    )
+    nets = (await db.execute(
+        select(staging.c.account_id, net_income, func.count())
+        .group_by(staging.c.account_id)
+        .order_by(staging.c.account_id)
+    )).all()
+    account_errors: list[ImportAccountError] = []
+    for account_id, net, count in nets:
+        stmt = balance_update(account_id, TransactionType.income, net, check_limit=net < 0)
+        if (await db.execute(stmt)).first() is None:
+            account_errors.append(ImportAccountError(
+                account_id=account_id, rows=count, error=f"Cupo insuficiente para el neto del archivo ({net:.0f})",
+            ))
+            error_count += count
+    if account_errors:
+        await db.execute(delete(staging).where(staging.c.account_id.in_([e.account_id for e in account_errors])))
+
+    tx_type = cast(staging.c.type, Transaction.__table__.c.type.type)
+    result = await db.execute(
+        insert(Transaction.__table__).from_select(
+            ["user_id", "account_id", "category_id", "type", "amount", "date", "description", "created_at"],
+            select(
+                literal(user_id), staging.c.account_id, staging.c.category_id, tx_type,
+                staging.c.amount, staging.c.date, staging.c.description, literal(datetime.utcnow()),
+            ).order_by(staging.c.date),
+        )
+    )
+    imported = result.rowcount
+    if imported:
+        await db.execute(rollup_upsert_from(staging, user_id))
+
+    return ImportResult(imported=imported, error_count=error_count, errors=errors, account_errors=account_errors)
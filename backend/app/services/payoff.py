@@ -0,0 +1,198 @@
+"""Simulador de estrategias de pago de varias deudas (avalancha, bola de nieve, orden propio).
+
+Cada mes las deudas generan interés (`interest_rate`, mensual en porcentaje), cada una recibe
+su cuota mínima (los recurrentes vinculados) y lo que sobra del presupuesto mensual va a la
+primera deuda pendiente según el orden de la estrategia; al saldarse una, el sobrante pasa
+a la siguiente en ese mismo mes.
+
+Entre dos pagos finales los montos de cada deuda no cambian, así que ese tramo se resuelve
+con la forma cerrada de una anualidad en lugar de mes a mes. El simulador avanza de evento
+en evento (el próximo mes en que alguna deuda se salda) para todas las estrategias a la vez:
+el número de iteraciones depende de cuántas deudas hay, no de cuántos meses dura el plan.
+"""
+from datetime import date
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.debt import Debt, DebtStatus, DebtType
+from app.services.amortization import linked_monthly_payments
+
+# Menos de medio centavo se considera saldado (errores de redondeo de la forma cerrada)
+SETTLED = 0.005
+
+
+def _months_to_payoff(balance: np.ndarray, rate: np.ndarray, payment: np.ndarray) -> np.ndarray:
+    """Primer mes en que una cuota fija salda cada deuda; inf si no la alcanza a saldar."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covered = payment > rate * balance
+        with_interest = np.log(payment / (payment - rate * balance)) / np.log1p(rate)
+        months = np.where(rate > 0, with_interest, balance / payment)
+    months = np.where((balance > 0) & (payment > 0) & covered, months, np.inf)
+    return np.ceil(months - 1e-9)
+
+
+def simulate_payoff(
+    balance: np.ndarray,
+    rate: np.ndarray,
+    minimum: np.ndarray,
+    budget: float,
+    orders: np.ndarray,
+    horizon: int,
+) -> dict[str, np.ndarray]:
+    """Simula S estrategias sobre D deudas durante a lo sumo `horizon` meses.
+
+    `balance`, `rate` (fracción mensual) y `minimum` son vectores de largo D; `orders` es una
+    matriz S × D con los índices de las deudas en orden de prioridad para cada estrategia.
+    Devuelve `payments`, `interest` y `remaining` como matrices S × horizon × D.
+    """
+    n_strategies, n_debts = orders.shape
+    rank = np.empty_like(orders)
+    np.put_along_axis(rank, orders, np.arange(n_debts)[None, :].repeat(n_strategies, axis=0), axis=1)
+    rows = np.arange(n_strategies)
+
+    payments = np.zeros((n_strategies, horizon, n_debts))
+    interest = np.zeros((n_strategies, horizon, n_debts))
+    remaining = np.zeros((n_strategies, horizon, n_debts))
+    b = np.tile(balance.astype(float), (n_strategies, 1))
+    r = rate[None, :]
+    t = 0
+    while t < horizon and (b > 0).any():
+        # Tramo: cuota mínima en cada deuda pendiente y el sobrante a la primera según el orden
+        active = b > 0
+        p = np.where(active, minimum, 0.0)
+        extra = np.where(active.any(axis=1), budget - p.sum(axis=1), 0.0)
+        target = np.where(active, rank, n_debts).argmin(axis=1)
+        p[rows, target] += extra
+
+        # Meses completos hasta el primer pago final de cualquier estrategia
+        step = max(int(min(_months_to_payoff(b, r, p).min(), horizon - t)), 1)
+        n = step - 1
+        if n > 0:
+            k = np.arange(1, n + 1)[:, None]
+            growth = (1 + r) ** k  # n × D
+            with np.errstate(divide="ignore", invalid="ignore"):
+                factor = np.where(r > 0, (growth - 1) / r, k)
+            closed = b[:, None, :] * growth - p[:, None, :] * factor
+            opening = np.concatenate([b[:, None, :], closed[:, :-1, :]], axis=1)
+            interest[:, t:t + n] = opening * r
+            payments[:, t:t + n] = p[:, None, :]
+            remaining[:, t:t + n] = np.where(closed < SETTLED, 0.0, closed)
+            b = remaining[:, t + n - 1].copy()
+            t += n
+
+        # Mes del evento, explícito: al saldarse una deuda el sobrante cae en cascada a la siguiente
+        month_interest = b * r
+        owed = b + month_interest
+        paid = np.minimum(np.where(b > 0, minimum, 0.0), owed)
+        left = np.where((b > 0).any(axis=1), budget - paid.sum(axis=1), 0.0)
+        for j in range(n_debts):
+            idx = orders[:, j]
+            extra = np.minimum(left, owed[rows, idx] - paid[rows, idx])
+            paid[rows, idx] += extra
+            left -= extra
+        b = owed - paid
+        b[b < SETTLED] = 0.0
+        interest[:, t] = month_interest
+        payments[:, t] = paid
+        remaining[:, t] = b
+        t += 1
+    return {"payments": payments, "interest": interest, "remaining": remaining}
+
+
+def _owe_debts(db: Session, user_id: int) -> list[Debt]:
+    return db.scalars(
+        select(Debt).where(
+            Debt.user_id == user_id,
+            Debt.type == DebtType.owe,
+            Debt.status == DebtStatus.active,
+            Debt.remaining_amount > 0,
+        ).order_by(Debt.id)
+    ).all()
+
+
+def compare_strategies(db: Session, user_id: int, budget: float, custom_order: list[int] | None = None) -> dict:
+    """Avalancha (mayor tasa primero), bola de nieve (menor saldo primero) y el orden propio, si se da.
+
+    Lanza ValueError si el orden propio menciona deudas ajenas o si el presupuesto no cubre
+    las cuotas mínimas.
+    """
+    debts = _owe_debts(db, user_id)
+    linked = linked_monthly_payments(db, user_id)
+    ids = [d.id for d in debts]
+    balance = np.array([d.remaining_amount for d in debts], dtype=float)
+    rate = np.array([(d.interest_rate or 0) / 100 for d in debts], dtype=float)
+    minimum = np.array([min(linked.get(d.id, 0.0), d.remaining_amount) for d in debts], dtype=float)
+    if minimum.sum() > budget:
+        raise ValueError(f"El presupuesto mensual no cubre las cuotas mínimas ({minimum.sum():.0f})")
+
+    avalanche = sorted(range(len(debts)), key=lambda i: (-rate[i], balance[i], ids[i]))
+    snowball = sorted(range(len(debts)), key=lambda i: (balance[i], -rate[i], ids[i]))
+    strategies = {"avalanche": avalanche, "snowball": snowball}
+    if custom_order is not None:
+        unknown = set(custom_order) - set(ids)
+        if unknown:
+            raise ValueError(f"Deudas no encontradas o no activas: {sorted(unknown)}")
+        # Las deudas que no están en el orden propio van al final, en orden de avalancha
+        given = [ids.index(debt_id) for debt_id in dict.fromkeys(custom_order)]
+        strategies["custom"] = given + [i for i in avalanche if i not in given]
+
+    result = {
+        "monthly_budget": budget,
+        "debts": [
+            {
+                "debt_id": d.id,
+                "counterpart_name": d.counterpart_name,
+                "balance": d.remaining_amount,
+                "interest_rate": d.interest_rate or 0.0,
+                "minimum_payment": round(float(minimum[i]), 2),
+            }
+            for i, d in enumerate(debts)
+        ],
+        "strategies": [],
+    }
+    if not debts:
+        return result
+
+    horizon = settings.amortization_max_periods
+    orders = np.array(list(strategies.values()))
+    sim = simulate_payoff(balance, rate, minimum, budget, orders, horizon)
+    today = date.today()
+    dates = [today + relativedelta(months=k) for k in range(1, horizon + 1)]
+
+    for s, (name, order) in enumerate(strategies.items()):
+        remaining = sim["remaining"][s]
+        settled = remaining.sum(axis=1) == 0
+        months = int(settled.argmax()) + 1 if settled.any() else None
+        n = months or horizon
+        # Mes en que se salda cada deuda: primera fila con saldo cero
+        zero = remaining == 0
+        debt_payoff = [int(zero[:, i].argmax()) if zero[:, i].any() else None for i in range(len(debts))]
+        payments = np.round(sim["payments"][s, :n], 2).tolist()
+        month_interest = np.round(sim["interest"][s, :n].sum(axis=1), 2).tolist()
+        month_remaining = np.round(remaining[:n].sum(axis=1), 2).tolist()
+        result["strategies"].append({
+            "strategy": name,
+            "order": [ids[i] for i in order],
+            "months": months,
+            "payoff_date": dates[months - 1] if months else None,
+            "total_interest": round(float(sim["interest"][s].sum()), 2),
+            "total_paid": round(float(sim["payments"][s].sum()), 2),
+            "debt_payoff_dates": {
+                ids[i]: dates[m] if m is not None else None for i, m in enumerate(debt_payoff)
+            },
+            "schedule": [
+                {
+                    "period": k + 1,
+                    "date": dates[k],
+                    "payments": dict(zip(ids, payments[k])),
+                    "interest": month_interest[k],
+                    "remaining": month_remaining[k],
+                }
+                for k in range(n)
+            ],
+        })
+    return result
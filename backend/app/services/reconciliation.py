@@ -0,0 +1,214 @@
+"""Conciliación de saldos: Account.balance contra el efecto de sus transacciones.
+
+Saldo esperado = opening_balance + efecto neto de las transacciones (en débito los
+ingresos suman y los gastos restan; en crédito al revés). Cada shard de usuarios
+(`user_id % shards`) se resuelve con una sola consulta agregada y los shards se
+reparten en un pool de procesos; cada proceso usa su propio engine.
+
+Por defecto el efecto sale de `monthly_rollups` (pocas filas por cuenta) y solo se
+revisan los usuarios con actividad en el rollup desde su último checkpoint;
+`--full` revisa a todos y `--source transactions` recalcula desde las filas crudas.
+El checkpoint no es la hora de la app sino el inicio de la transacción abierta más
+antigua de la base al arrancar (menos un margen): el rollup se sella con el `now()` de
+su transacción, así que una escritura sellada antes pero confirmada después de la
+lectura queda por encima del checkpoint y se revisa en la siguiente corrida.
+Con `--repair` las cuentas desviadas se corrigen si su saldo no cambió mientras
+tanto (si cambió, se reporta y queda para la próxima corrida).
+
+Uso: `python -m app.services.reconciliation [--full] [--repair] [--source rollups|transactions]`.
+"""
+import argparse
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import Select, case, exists, func, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+from app.models.account import Account, AccountType
+from app.models.ledger_checkpoint import LedgerCheckpoint
+from app.models.monthly_rollup import MonthlyRollup
+from app.models.transaction import Transaction, TransactionType
+from app.utils.etag import version_bump
+
+SOURCES = ("rollups", "transactions")
+
+# Inicio (UTC) de la transacción abierta más antigua de la base; la propia cuenta si no hay otras.
+# Las sesiones de otros roles se ven con xact_start NULL: las cubre el margen.
+_OLDEST_OPEN_TRANSACTION = text(
+    "SELECT timezone('UTC', LEAST(now(), min(xact_start))) FROM pg_stat_activity WHERE datname = current_database()"
+)
+
+
+def _watermark() -> datetime:
+    """Checkpoint de la corrida: lo confirmado después de la lectura tiene un sello posterior."""
+    from app.database import SessionLocal
+
+    with SessionLocal() as db:
+        oldest = db.scalar(_OLDEST_OPEN_TRANSACTION)
+    return oldest - timedelta(seconds=settings.reconciliation_watermark_margin_seconds)
+
+
+def _stale_users(shard: int, shards: int) -> Select:
+    """Usuarios del shard sin checkpoint o con cambios en el rollup desde el último."""
+    changed = exists().where(
+        MonthlyRollup.user_id == Account.user_id,
+        MonthlyRollup.updated_at >= LedgerCheckpoint.verified_at,
+    )
+    return (
+        select(Account.user_id)
+        .outerjoin(LedgerCheckpoint, LedgerCheckpoint.user_id == Account.user_id)
+        .where(Account.user_id % shards == shard, or_(LedgerCheckpoint.user_id.is_(None), changed))
+        .distinct()
+    )
+
+
+def expected_balances(shard: int, shards: int, source: str = "rollups", incremental: bool = True) -> Select:
+    """(account_id, user_id, balance, expected) de todas las cuentas del shard."""
+    if source == "rollups":
+        src_user, src_account, src_type, src_amount = (
+            MonthlyRollup.user_id, MonthlyRollup.account_id, MonthlyRollup.type, MonthlyRollup.total,
+        )
+    else:
+        src_user, src_account, src_type, src_amount = (
+            Transaction.user_id, Transaction.account_id, Transaction.type, Transaction.amount,
+        )
+    src_filter = [src_user % shards == shard]
+    account_filter = [Account.user_id % shards == shard]
+    if incremental:
+        stale = _stale_users(shard, shards)
+        src_filter.append(src_user.in_(stale))
+        account_filter.append(Account.user_id.in_(stale))
+
+    income_net = (
+        select(
+            src_account.label("account_id"),
+            func.sum(case((src_type == TransactionType.income, src_amount), else_=-src_amount)).label("net"),
+        )
+        .where(*src_filter)
+        .group_by(src_account)
+        .subquery()
+    )
+    net = func.coalesce(income_net.c.net, 0.0)
+    effect = case((Account.type == AccountType.debit, net), else_=-net)
+    return (
+        select(
+            Account.id.label("account_id"),
+            Account.user_id,
+            Account.balance,
+            (Account.opening_balance + effect).label("expected"),
+        )
+        .outerjoin(income_net, income_net.c.account_id == Account.id)
+        .where(*account_filter)
+    )
+
+
+def reconcile_shard(
+    shard: int,
+    shards: int,
+    started_at: datetime,
+    source: str = "rollups",
+    incremental: bool = True,
+    repair: bool = False,
+    tolerance: float = 0.01,
+) -> dict:
+    """Concilia un shard y guarda sus checkpoints. Corre dentro de un proceso del pool."""
+    from app.database import SessionLocal
+
+    drift = []
+    per_user: dict[int, list[int]] = {}
+    with SessionLocal() as db:
+        rows = db.execute(expected_balances(shard, shards, source, incremental)).all()
+        for row in rows:
+            counts = per_user.setdefault(row.user_id, [0, 0])
+            counts[0] += 1
+            if abs(row.balance - row.expected) <= tolerance:
+                continue
+            counts[1] += 1
+            repaired = False
+            if repair:
+                # Solo si nadie movió el saldo desde la lectura; si no, la próxima corrida lo revisa
+                repaired = db.execute(
+                    update(Account)
+                    .where(Account.id == row.account_id, Account.balance == row.balance)
+                    .values(balance=row.expected)
+                ).rowcount == 1
+            drift.append({
+                "account_id": row.account_id,
+                "user_id": row.user_id,
+                "balance": row.balance,
+                "expected": round(row.expected, 2),
+                "drift": round(row.balance - row.expected, 2),
+                "repaired": repaired,
+            })
+
+        repaired_users = sorted({d["user_id"] for d in drift if d["repaired"]})
+        for user_id in repaired_users:
+            db.execute(version_bump(user_id, "accounts"))
+        if per_user:
+            stmt = insert(LedgerCheckpoint).values([
+                {"user_id": user_id, "verified_at": started_at, "accounts_checked": n, "drifted_accounts": d}
+                for user_id, (n, d) in sorted(per_user.items())
+            ])
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[LedgerCheckpoint.user_id],
+                set_={
+                    "verified_at": stmt.excluded.verified_at,
+                    "accounts_checked": stmt.excluded.accounts_checked,
+                    "drifted_accounts": stmt.excluded.drifted_accounts,
+                },
+            ))
+        db.commit()
+    return {"users": len(per_user), "accounts": len(rows), "drift": drift}
+
+
+def run_reconciliation(
+    source: str = "rollups",
+    incremental: bool = True,
+    repair: bool = False,
+    shards: int | None = None,
+    workers: int | None = None,
+    tolerance: float = 0.01,
+) -> dict:
+    shards = shards or settings.reconciliation_shards
+    workers = min(workers or settings.reconciliation_workers, shards)
+    # Se toma antes de leer: lo escrito durante la corrida se revisa en la siguiente
+    started_at = _watermark()
+    began = datetime.utcnow()
+    summary = {"source": source, "incremental": incremental, "users": 0, "accounts": 0, "drift": []}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [
+            pool.submit(reconcile_shard, shard, shards, started_at, source, incremental, repair, tolerance)
+            for shard in range(shards)
+        ]
+        for future in futures:
+            result = future.result()
+            summary["users"] += result["users"]
+            summary["accounts"] += result["accounts"]
+            summary["drift"].extend(result["drift"])
+    summary["elapsed_seconds"] = round((datetime.utcnow() - began).total_seconds(), 2)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concilia Account.balance con sus transacciones")
+    parser.add_argument("--full", action="store_true", help="revisar todos los usuarios, no solo los modificados")
+    parser.add_argument("--repair", action="store_true", help="corregir los saldos desviados")
+    parser.add_argument("--source", choices=SOURCES, default="rollups")
+    parser.add_argument("--shards", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--tolerance", type=float, default=0.01)
+    args = parser.parse_args()
+    result = run_reconciliation(
+        source=args.source,
+        incremental=not args.full,
+        repair=args.repair,
+        shards=args.shards,
+        workers=args.workers,
+        tolerance=args.tolerance,
+    )
+    for item in result.pop("drift"):
+        print(json.dumps(item))
+    print(json.dumps(result))
@@ -0,0 +1,91 @@
+"""Expansión de ocurrencias de recurrentes con aritmética de fechas de NumPy.
+
+Produce las mismas fechas que avanzar de a un periodo con `next_occurrence`, sin iterar:
+diario/semanal/quincenal son progresiones aritméticas de días; mensual/anual avanzan de
+a 1 o 12 meses con relativedelta, que recorta el día al largo del mes y lo conserva
+recortado (31-ene → 28-feb → 28-mar). Ese día es el mínimo acumulado entre el día
+inicial y los largos de los meses recorridos.
+
+`expand_many` resuelve muchos recurrentes en una sola pasada: cada serie es un tramo de
+un arreglo plano (np.repeat + desplazamientos), sin un ciclo por recurrente.
+"""
+from datetime import date
+
+import numpy as np
+
+from app.models.recurring import Frequency
+
+STEP_DAYS = {Frequency.daily: 1, Frequency.weekly: 7, Frequency.biweekly: 14}
+STEP_MONTHS = {Frequency.monthly: 1, Frequency.yearly: 12}
+
+
+def _ragged(counts: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Para tramos de largo `counts`: índice del tramo y posición dentro de él, aplanados."""
+    segment = np.repeat(np.arange(len(counts)), counts)
+    starts = np.cumsum(counts) - counts
+    return segment, np.arange(counts.sum()) - starts[segment]
+
+
+def _expand_days(start: np.ndarray, step: np.ndarray, first: np.datetime64, last: np.datetime64):
+    # Primera ocurrencia dentro de la ventana y cuántas caben hasta `last`
+    skip = np.maximum(-((start - first).astype(int) // step), 0)
+    begin = start + skip * step
+    counts = np.where(begin <= last, (last - begin).astype(int) // step + 1, 0)
+    segment, k = _ragged(counts)
+    return segment, begin[segment] + k * step[segment]
+
+
+def _expand_months(start: np.ndarray, step: np.ndarray, first: np.datetime64, last: np.datetime64):
+    # El día recortado depende de todos los meses recorridos desde el inicio, así que se
+    # generan desde `start` y se descartan al final las anteriores a la ventana
+    start_month = start.astype("datetime64[M]")
+    span = (last.astype("datetime64[M]") - start_month).astype(int)
+    counts = np.where(span >= 0, span // step + 1, 0)
+    segment, k = _ragged(counts)
+    months = start_month[segment] + k * step[segment]
+    month_length = ((months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")).astype(int)
+    # Mínimo acumulado por tramo: un desplazamiento decreciente por tramo hace que el mínimo
+    # de un tramo anterior nunca pase al siguiente (los largos de mes están entre 28 y 31)
+    offset = (len(counts) - segment) * 32
+    clamp = np.minimum.accumulate(month_length + offset) - offset
+    start_day = (start - start_month.astype("datetime64[D]")).astype(int) + 1
+    dates = months.astype("datetime64[D]") + np.minimum(start_day[segment], clamp) - 1
+    keep = (dates >= first) & (dates <= last)
+    return segment[keep], dates[keep]
+
+
+def expand_many(
+    starts: list[date],
+    frequencies: list[Frequency],
+    window_from: date,
+    window_to: date,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Ocurrencias de varias series dentro de [window_from, window_to].
+
+    Cada serie empieza en `starts[i]` (su next_date) con `frequencies[i]`. Devuelve dos
+    arreglos paralelos, ordenados por fecha y luego por serie: el índice de la serie y la
+    fecha (datetime64[D]) de cada ocurrencia.
+    """
+    first = np.datetime64(window_from, "D")
+    last = np.datetime64(window_to, "D")
+    start = np.array(starts, dtype="datetime64[D]")
+    freq = np.array([f.value for f in frequencies], dtype=object)
+    segments, dates = [], []
+    for steps, expand_group in ((STEP_DAYS, _expand_days), (STEP_MONTHS, _expand_months)):
+        members = np.flatnonzero(np.isin(freq, [f.value for f in steps]))
+        if not len(members):
+            continue
+        step = np.array([steps[Frequency(v)] for v in freq[members]], dtype=int)
+        segment, when = expand_group(start[members], step, first, last)
+        segments.append(members[segment])
+        dates.append(when)
+    if not segments:
+        return np.array([], dtype=int), np.array([], dtype="datetime64[D]")
+    segment, when = np.concatenate(segments), np.concatenate(dates)
+    order = np.lexsort((segment, when))
+    return segment[order], when[order]
+
+
+def expand(start: date, frequency: Frequency, end: date) -> np.ndarray:
+    """Ocurrencias de una serie desde `start` (incluida) hasta `end` (incluida)."""
+    return expand_many([start], [frequency], start, end)[1]
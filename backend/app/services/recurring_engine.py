@@ -0,0 +1,199 @@
+"""Motor de recurrentes: cobra en lote todas las ocurrencias vencidas.
+
+Un barrido indexado (`ix_recurring_expenses_due`) encuentra los recurrentes activos con
+`next_date <= hoy` de todos los usuarios. Los usuarios se reparten en shards
+(`user_id % shards`) que corren en paralelo, cada usuario en su propia transacción:
+
+- se cobran todas las ocurrencias atrasadas (no solo una), con la fecha de cada una;
+- el saldo de cada cuenta se actualiza una sola vez con el total del usuario;
+- si el recurrente está vinculado a una deuda activa se abona igual que en el pago manual;
+- `recurring_payments(recurring_expense_id, occurrence_date)` es único, así que correr
+  el motor dos veces (o en paralelo con un pago manual) no duplica cobros.
+
+Uso: `python -m app.services.recurring_engine [--date YYYY-MM-DD] [--shards N]`.
+"""
+import argparse
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.debt import Debt, DebtPayment, DebtStatus
+from app.models.recurring import RecurringExpense, RecurringPayment, Frequency
+from app.models.transaction import Transaction, TransactionType
+from app.services.balances import balance_update
+from app.services.rollups import rollup_upsert
+from app.utils.cache import invalidate_dashboard, invalidate_debt_schedules
+from app.utils.etag import version_bump
+
+logger = logging.getLogger(__name__)
+
+
+def next_occurrence(current: date, frequency: Frequency) -> date:
+    if frequency == Frequency.daily:
+        return current + timedelta(days=1)
+    elif frequency == Frequency.weekly:
+        return current + timedelta(weeks=1)
+    elif frequency == Frequency.biweekly:
+        return current + timedelta(weeks=2)
+    elif frequency == Frequency.monthly:
+        return current + relativedelta(months=1)
+    elif frequency == Frequency.yearly:
+        return current + relativedelta(years=1)
+    return current
+
+
+def due_occurrences(next_date: date, frequency: Frequency, today: date, limit: int) -> tuple[list[date], date]:
+    """Ocurrencias desde `next_date` hasta `today` (máximo `limit`) y el nuevo next_date.
+
+    Avanza de a un periodo como el pago manual, para que ambos caminos produzcan el
+    mismo calendario (31-ene → 28-feb → 28-mar con relativedelta).
+    """
+    dates = []
+    current = next_date
+    while current <= today and len(dates) < limit:
+        dates.append(current)
+        current = next_occurrence(current, frequency)
+    return dates, current
+
+
+def apply_debt_payment(db: Session, r: RecurringExpense, on: date) -> None:
+    """Spec 005: abono automático a la deuda activa vinculada al recurrente."""
+    if not r.debt_id:
+        return
+    # FOR UPDATE como POST /debts/{id}/payments: un abono manual concurrente no se pierde al
+    # escribir el saldo pendiente. Con autoflush=False, lo abonado por una ocurrencia
+    # anterior de este mismo lote se baja a la base antes de releer la fila.
+    db.flush()
+    debt = db.get(Debt, r.debt_id, with_for_update=True, populate_existing=True)
+    if not debt or debt.user_id != r.user_id or debt.status != DebtStatus.active:
+        return
+    payment_amount = min(r.amount, debt.remaining_amount)
+    debt.remaining_amount = max(0, debt.remaining_amount - payment_amount)
+    if debt.remaining_amount <= 0:
+        debt.status = DebtStatus.paid
+    db.add(DebtPayment(
+        debt_id=debt.id,
+        amount=payment_amount,
+        date=on,
+        notes=f"Pago automático desde recurrente: {r.name}",
+    ))
+
+
+def _process_user(user_id: int, today: date) -> int:
+    """Cobra las ocurrencias vencidas de un usuario; devuelve cuántas se registraron."""
+    with SessionLocal() as db:
+        # SKIP LOCKED: si otra instancia del motor ya tiene este recurrente, se omite
+        due = db.scalars(
+            select(RecurringExpense)
+            .where(
+                RecurringExpense.user_id == user_id,
+                RecurringExpense.is_active.is_(True),
+                RecurringExpense.next_date <= today,
+            )
+            .order_by(RecurringExpense.id)
+            .with_for_update(skip_locked=True)
+        ).all()
+
+        posted = 0
+        totals: dict[int, float] = defaultdict(float)
+        new_txs: list[Transaction] = []
+        for r in due:
+            dates, r.next_date = due_occurrences(r.next_date, r.frequency, today, settings.recurring_max_catchup)
+            if not dates:
+                continue
+            # Solo se cobran las ocurrencias que no tenían pago (idempotencia por ocurrencia)
+            new_dates = db.scalars(
+                insert(RecurringPayment)
+                .values([
+                    {"recurring_expense_id": r.id, "paid_date": d, "occurrence_date": d, "amount": r.amount}
+                    for d in dates
+                ])
+                .on_conflict_do_nothing(constraint="uq_recurring_payments_occurrence")
+                .returning(RecurringPayment.occurrence_date)
+            ).all()
+            for d in sorted(new_dates):
+                new_txs.append(Transaction(
+                    user_id=user_id,
+                    account_id=r.account_id,
+                    category_id=r.category_id,
+                    type=TransactionType.expense,
+                    amount=r.amount,
+                    date=d,
+                    description=f"Pago recurrente: {r.name}",
+                ))
+                apply_debt_payment(db, r, d)
+            totals[r.account_id] += r.amount * len(new_dates)
+            posted += len(new_dates)
+
+        # Un UPDATE atómico por cuenta, en orden de id, antes de tocar los rollups
+        for account_id in sorted(totals):
+            db.execute(balance_update(account_id, TransactionType.expense, totals[account_id]))
+        db.add_all(new_txs)
+        if new_txs:
+            db.execute(rollup_upsert(new_txs))
+        if due:
+            # next_date avanzó; saldos y abonos a deudas solo si se cobró algo
+            resources = ["recurring"]
+            if posted:
+                resources.append("accounts")
+            if posted and any(r.debt_id for r in due):
+                resources.append("debts")
+            db.execute(version_bump(user_id, *resources))
+
+        db.commit()
+    if posted:
+        invalidate_dashboard(user_id)
+        invalidate_debt_schedules(user_id)
+    return posted
+
+
+def _process_shard(user_ids: list[int], today: date) -> dict:
+    result = {"users": 0, "occurrences": 0, "errors": 0}
+    for user_id in user_ids:
+        try:
+            result["occurrences"] += _process_user(user_id, today)
+            result["users"] += 1
+        except Exception:
+            # Un usuario con datos inconsistentes no debe frenar al resto del shard
+            logger.exception(f"Recurring engine failed for user {user_id}")
+            result["errors"] += 1
+    return result
+
+
+def run_due_recurring(today: date | None = None, shards: int | None = None) -> dict:
+    today = today or date.today()
+    shards = max(1, shards or settings.recurring_engine_shards)
+    with SessionLocal() as db:
+        user_ids = db.scalars(
+            select(RecurringExpense.user_id)
+            .where(RecurringExpense.is_active.is_(True), RecurringExpense.next_date <= today)
+            .distinct()
+        ).all()
+
+    buckets: list[list[int]] = [[] for _ in range(shards)]
+    for user_id in user_ids:
+        buckets[user_id % shards].append(user_id)
+
+    summary = {"date": today.isoformat(), "users": 0, "occurrences": 0, "errors": 0}
+    with ThreadPoolExecutor(max_workers=shards, thread_name_prefix="recurring") as pool:
+        for result in pool.map(lambda ids: _process_shard(ids, today), [b for b in buckets if b]):
+            for key in ("users", "occurrences", "errors"):
+                summary[key] += result[key]
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cobra las ocurrencias vencidas de los gastos recurrentes")
+    parser.add_argument("--date", type=date.fromisoformat, default=None)
+    parser.add_argument("--shards", type=int, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(run_due_recurring(args.date, args.shards))
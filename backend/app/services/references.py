@@ -0,0 +1,51 @@
+"""Cuentas y categorías del usuario (id → fila) desde el cache en proceso.
+
+Cada entrada guarda la versión de `resource_versions` con la que se leyó:
+
+- los listados leen la versión (ya la necesitan para el ETag) y usan el cache solo si
+  coincide, así que ven las escrituras de cualquier proceso, cambios de saldo incluidos;
+- las validaciones de pertenencia (`owned`) usan la entrada sin releer la versión: el dueño
+  y el tipo de una cuenta o categoría no cambian. Si el id no está se relee de la base
+  (puede haberse creado desde otro proceso); una cuenta borrada desde otro proceso la
+  rechaza después el UPDATE del saldo.
+
+Las escrituras de cuentas y categorías de este proceso descartan la entrada al confirmar
+(`invalidate_references`). Las filas son dicts compartidos entre requests: no se modifican.
+"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.account import Account
+from app.models.category import Category
+from app.schemas.account import AccountOut
+from app.schemas.category import CategoryOut
+from app.utils.cache import reference_cache
+from app.utils.etag import version_select
+
+REFERENCES = {
+    "accounts": (Account, AccountOut),
+    "categories": (Category, CategoryOut),
+}
+
+
+async def reference_rows(db: AsyncSession, user_id: int, resource: str, version: int | None = None) -> dict[int, dict]:
+    """Filas del usuario por id (en orden de id) al día con `version`; si no se da, se lee."""
+    if version is None:
+        version = await db.scalar(version_select(user_id, resource))
+    cached = reference_cache.get((user_id, resource))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    epoch = reference_cache.epoch
+    model, schema = REFERENCES[resource]
+    result = await db.scalars(select(model).where(model.user_id == user_id).order_by(model.id))
+    rows = {row.id: schema.model_validate(row).model_dump() for row in result}
+    reference_cache.set((user_id, resource), (version, rows), epoch=epoch)
+    return rows
+
+
+async def owned(db: AsyncSession, user_id: int, resource: str, row_id: int) -> dict | None:
+    """La fila `row_id` si es del usuario; None si no existe o es de otro."""
+    cached = reference_cache.get((user_id, resource))
+    if cached is not None and row_id in cached[1]:
+        return cached[1][row_id]
+    return (await reference_rows(db, user_id, resource)).get(row_id)
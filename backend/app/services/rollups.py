@@ -0,0 +1,191 @@
+"""Mantenimiento incremental de `monthly_rollups`.
+
+Cada camino que crea, modifica o borra transacciones arma con `rollup_upsert` un
+INSERT ... ON CONFLICT DO UPDATE con los deltas por clave y lo ejecuta en su propia
+sesión (sync o async), así el rollup se confirma en la misma transacción que las filas
+de `transactions`. Las claves se ordenan antes de insertar para que dos transacciones
+concurrentes bloqueen filas del rollup siempre en el mismo orden.
+
+`updated_at` se sella con el `now()` de la base (inicio de la transacción, en UTC) y no
+con el reloj de la app: la conciliación incremental compara contra la transacción
+abierta más antigua al arrancar (ver `app.services.reconciliation`).
+
+Reconstrucción completa: `python -m app.services.rollups [--user-id N]`.
+"""
+import argparse
+from typing import Iterable
+
+from sqlalchemy import cast, delete, extract, func, literal, literal_column, select, text
+from sqlalchemy.dialects.postgresql import Insert, insert
+from sqlalchemy.orm import Session
+
+from app.models.monthly_rollup import MonthlyRollup
+from app.models.transaction import Transaction, TransactionType
+
+RollupEntry = tuple[tuple, float]
+
+_rollups = MonthlyRollup.__table__
+_COLUMNS = ("user_id", "year", "month", "category_id", "account_id", "type", "is_transfer")
+# Debe coincidir con el índice único uq_monthly_rollups_key
+_CONFLICT_TARGET = [
+    _rollups.c.user_id,
+    _rollups.c.year,
+    _rollups.c.month,
+    func.coalesce(_rollups.c.category_id, literal_column("0")),
+    _rollups.c.account_id,
+    _rollups.c.type,
+    _rollups.c.is_transfer,
+]
+
+
+def rollup_entry(tx: Transaction) -> RollupEntry:
+    """Clave y monto de una transacción en su estado actual (tomar antes de modificarla)."""
+    key = (
+        tx.user_id,
+        tx.date.year,
+        tx.date.month,
+        tx.category_id,
+        tx.account_id,
+        TransactionType(tx.type),
+        tx.transfer_pair_id is not None,
+    )
+    return key, tx.amount
+
+
+def _as_entry(item: Transaction | RollupEntry) -> RollupEntry:
+    return rollup_entry(item) if isinstance(item, Transaction) else item
+
+
+def _sort_key(key: tuple) -> tuple:
+    user_id, year, month, category_id, account_id, tx_type, is_transfer = key
+    return user_id, year, month, category_id or 0, account_id, tx_type.value, is_transfer
+
+
+def _stamp():
+    # timestamp sin zona en UTC, como el resto de las columnas
+    return func.timezone("UTC", func.now())
+
+
+def _upsert(stmt: Insert) -> Insert:
+    return stmt.on_conflict_do_update(
+        index_elements=_CONFLICT_TARGET,
+        set_={
+            "total": _rollups.c.total + stmt.excluded.total,
+            "count": _rollups.c.count + stmt.excluded.count,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+
+
+def rollup_upsert(
+    added: Iterable[Transaction | RollupEntry] = (),
+    removed: Iterable[Transaction | RollupEntry] = (),
+) -> Insert | None:
+    """Sentencia que aplica los deltas al rollup, o None si se anulan entre sí."""
+    deltas: dict[tuple, list] = {}
+    for sign, items in ((1, added), (-1, removed)):
+        for item in items:
+            key, amount = _as_entry(item)
+            delta = deltas.setdefault(key, [0.0, 0])
+            delta[0] += sign * amount
+            delta[1] += sign
+    now = _stamp()
+    rows = [
+        {**dict(zip(_COLUMNS, key)), "total": total, "count": count, "updated_at": now}
+        for key, (total, count) in sorted(deltas.items(), key=lambda kv: _sort_key(kv[0]))
+        if total or count
+    ]
+    if not rows:
+        return None
+    return _upsert(insert(_rollups).values(rows))
+
+
+def rollup_upsert_from(source, user_id: int) -> Insert:
+    """Suma al rollup las filas de una tabla de staging de un usuario (sin transferencias).
+
+    `source` debe tener columnas date, category_id, account_id, type y amount.
+    """
+    year = extract("year", source.c.date)
+    month = extract("month", source.c.date)
+    tx_type = cast(source.c.type, _rollups.c.type.type)
+    grouped = select(
+        literal(user_id),
+        year,
+        month,
+        source.c.category_id,
+        source.c.account_id,
+        tx_type,
+        literal(False),
+        func.sum(source.c.amount),
+        func.count(),
+        _stamp(),
+    ).group_by(year, month, source.c.category_id, source.c.account_id, tx_type)
+    return _upsert(insert(_rollups).from_select([*_COLUMNS, "total", "count", "updated_at"], grouped))
+
+
+def rollup_merge_category(category_id: int) -> list:
+    """Sentencias para mover los totales de una categoría borrada a "sin categoría".
+
+    Al borrar una categoría el ORM deja en NULL el category_id de sus transacciones.
+    """
+    moved = select(
+        _rollups.c.user_id,
+        _rollups.c.year,
+        _rollups.c.month,
+        literal(None).label("category_id"),
+        _rollups.c.account_id,
+        _rollups.c.type,
+        _rollups.c.is_transfer,
+        _rollups.c.total,
+        _rollups.c.count,
+        _stamp().label("updated_at"),
+    ).where(_rollups.c.category_id == category_id)
+    return [
+        _upsert(insert(_rollups).from_select([*_COLUMNS, "total", "count", "updated_at"], moved)),
+        delete(_rollups).where(_rollups.c.category_id == category_id),
+    ]
+
+
+def rebuild_rollups(db: Session, user_id: int | None = None) -> int:
+    """Regenera el rollup desde `transactions` (todo, o solo un usuario). No hace commit.
+
+    El lock EXCLUSIVE frena los deltas concurrentes hasta el commit: las escrituras que
+    ya estaban en curso se confirman antes (el lock las espera) y quedan en la lectura.
+    """
+    db.execute(text("LOCK TABLE monthly_rollups IN EXCLUSIVE MODE"))
+    clear = delete(_rollups)
+    if user_id is not None:
+        clear = clear.where(_rollups.c.user_id == user_id)
+    db.execute(clear)
+
+    year = extract("year", Transaction.date)
+    month = extract("month", Transaction.date)
+    is_transfer = Transaction.transfer_pair_id.isnot(None)
+    totals = select(
+        Transaction.user_id,
+        year,
+        month,
+        Transaction.category_id,
+        Transaction.account_id,
+        Transaction.type,
+        is_transfer,
+        func.sum(Transaction.amount),
+        func.count(),
+        _stamp(),
+    ).group_by(Transaction.user_id, year, month, Transaction.category_id, Transaction.account_id, Transaction.type, is_transfer)
+    if user_id is not None:
+        totals = totals.where(Transaction.user_id == user_id)
+    result = db.execute(insert(_rollups).from_select([*_COLUMNS, "total", "count", "updated_at"], totals))
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Reconstruye monthly_rollups desde transactions")
+    parser.add_argument("--user-id", type=int, default=None)
+    args = parser.parse_args()
+    with SessionLocal() as db:
+        rows = rebuild_rollups(db, args.user_id)
+        db.commit()
+    print(f"{rows} filas de rollup regeneradas")
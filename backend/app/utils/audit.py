@@ -1,22 +1,108 @@
+import logging
+import queue
+import threading
+import time
 from datetime import datetime
-from sqlalchemy.orm import Session
 
+from sqlalchemy import insert
+
+from app.config import settings
+from app.database import engine
 from app.models.audit_log import AuditLog
 
+logger = logging.getLogger(__name__)
+
+# Los eventos de auditoría no comparten la transacción de la request: se encolan en
+# memoria y un hilo de fondo los inserta en lotes (por tamaño o por tiempo). Si la cola
+# se llena (la BD no da abasto) los eventos nuevos se descartan en vez de bloquear.
+_queue: queue.Queue = queue.Queue(maxsize=settings.audit_queue_max_size)
+_writer: threading.Thread | None = None
+_writer_lock = threading.Lock()
+_stop = object()
+_dropped = 0
+_dropped_lock = threading.Lock()
+
+
+def _write_batch(rows: list[dict]) -> None:
+    try:
+        with engine.begin() as conn:
+            conn.execute(insert(AuditLog), rows)
+    except Exception as e:
+        logger.error(f"Error writing {len(rows)} audit log entries: {e}")
+
+
+def _run_writer() -> None:
+    batch: list[dict] = []
+    deadline = None
+    while True:
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+        try:
+            item = _queue.get(timeout=timeout)
+        except queue.Empty:
+            item = None
+        if item is _stop:
+            if batch:
+                _write_batch(batch)
+            return
+        if item is not None:
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + settings.audit_flush_interval_seconds
+        if batch and (len(batch) >= settings.audit_batch_size or time.monotonic() >= deadline):
+            _write_batch(batch)
+            batch = []
+            deadline = None
+
+
+def _ensure_writer() -> None:
+    global _writer
+    if _writer is not None:
+        return
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_run_writer, name="audit-writer", daemon=True)
+            _writer.start()
+
+
+def shutdown_audit_writer(timeout: float = 5.0) -> None:
+    """Vacía la cola pendiente y detiene el hilo escritor (se llama al apagar la app).
+
+    `timeout` acota toda la espera: con la cola llena y la BD trabada los eventos
+    pendientes se pierden (el hilo es daemon) en vez de colgar el apagado.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            _queue.put(_stop, timeout=timeout)
+        except queue.Full:
+            logger.warning(f"Audit queue still full after {timeout}s at shutdown, {_queue.qsize()} entries not written")
+        else:
+            _writer.join(max(deadline - time.monotonic(), 0))
+        _writer = None
+
 
 def log_action(
-    db: Session,
     action: str,
     user_id: int | None = None,
     ip: str | None = None,
     details: str | None = None,
 ) -> None:
-    entry = AuditLog(
-        user_id=user_id,
-        action=action,
-        ip=ip,
-        details=details,
-        created_at=datetime.utcnow(),
-    )
-    db.add(entry)
-    db.commit()
+    global _dropped
+    _ensure_writer()
+    try:
+        _queue.put_nowait({
+            "user_id": user_id,
+            "action": action,
+            "ip": ip,
+            "details": details,
+            "created_at": datetime.utcnow(),
+        })
+    except queue.Full:
+        with _dropped_lock:
+            _dropped += 1
+            dropped = _dropped
+        if dropped == 1 or dropped % 1000 == 0:
+            logger.warning(f"Audit queue full, {dropped} entries dropped so far")
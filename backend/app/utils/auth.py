@@ -1,3 +1,6 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 import bcrypt
@@ -6,12 +9,68 @@ import uuid
 from app.config import settings
 
 
+class PasswordHasherBusy(Exception):
+    """El pool de hashing tiene todos sus cupos ocupados; la request debe responder 503."""
+
+
+# bcrypt tarda ~250 ms de CPU a 12 rondas. Se ejecuta en un pool de procesos propio y
+# acotado para no agotar el threadpool compartido de AnyIO: como máximo
+# `password_hash_max_pending` requests esperan un hash a la vez, el resto falla rápido.
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(settings.password_hash_max_pending)
+
+
+def _hashpw(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+
+
+def _checkpw(plain: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(plain, hashed)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.password_hash_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def _run_in_pool(fn, *args):
+    if not _pending.acquire(blocking=False):
+        raise PasswordHasherBusy()
+    try:
+        return _get_pool().submit(fn, *args).result()
+    finally:
+        _pending.release()
+
+
+def shutdown_password_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password[:72].encode("utf-8"), bcrypt.gensalt(rounds=12)).decode("utf-8")
+    return _run_in_pool(_hashpw, password[:72].encode("utf-8"), settings.bcrypt_rounds).decode("utf-8")
 
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return bcrypt.checkpw(plain[:72].encode("utf-8"), hashed.encode("utf-8"))
+    return _run_in_pool(_checkpw, plain[:72].encode("utf-8"), hashed.encode("utf-8"))
+
+
+def password_needs_rehash(hashed: str) -> bool:
+    """True si el hash se generó con un costo distinto al configurado ($2b$<rondas>$...)."""
+    try:
+        return int(hashed.split("$")[2]) != settings.bcrypt_rounds
+    except (IndexError, ValueError):
+        return False
 
 
 def create_token(user_id: int) -> str:
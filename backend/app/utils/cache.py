@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from app.config import settings
+
+
+class TTLCache:
+    """LRU acotado con expiración por entrada, seguro entre hilos.
+
+    Los handlers sync corren en el threadpool, así que todo acceso va bajo lock.
+    `epoch` cambia con cada invalidación: quien calcula un valor a partir de la DB
+    lo guarda con `set(..., epoch=e)` y se descarta si hubo una escritura mientras
+    tanto, para no volver a cachear datos ya invalidados.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._epoch = 0
+
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, epoch: int | None = None) -> None:
+        with self._lock:
+            if epoch is not None and epoch != self._epoch:
+                return
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._data.clear()
+
+
+# Resumen del dashboard serializado, por user_id
+dashboard_cache = TTLCache(settings.dashboard_cache_max_users, settings.dashboard_cache_ttl_seconds)
+
+
+def invalidate_dashboard(user_id: int) -> None:
+    """Llamar tras cualquier escritura que cambie saldos, movimientos o recurrentes del usuario."""
+    dashboard_cache.invalidate(user_id)
+
+
+# Tablas de amortización de deudas por user_id, junto con el día en que se calcularon
+debt_schedule_cache = TTLCache(settings.debt_schedule_cache_max_users, settings.debt_schedule_cache_ttl_seconds)
+
+
+def invalidate_debt_schedules(user_id: int) -> None:
+    """Llamar tras cualquier cambio en deudas, sus abonos o los recurrentes vinculados."""
+    debt_schedule_cache.invalidate(user_id)
+
+
+# Cuentas y categorías por (user_id, recurso): versión con la que se leyeron y filas por id
+reference_cache = TTLCache(settings.reference_cache_max_entries, settings.reference_cache_ttl_seconds)
+
+
+def invalidate_references(user_id: int, *resources: str) -> None:
+    """Llamar tras crear, editar o borrar cuentas ("accounts") o categorías ("categories")."""
+    for resource in resources:
+        reference_cache.invalidate((user_id, resource))
@@ -1,22 +1,17 @@
+import json
 import logging
+from datetime import datetime
+
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+EMAIL_FROM = "FinZen <onboarding@resend.dev>"
+
 
-def send_verification_email(email: str, token: str) -> None:
+def render_verification_email(token: str) -> tuple[str, str]:
     url = f"{settings.frontend_url}/confirmar-email?token={token}"
-    if not settings.resend_api_key:
-        print(f"[DEV] Verification link for {email}: {url}", flush=True)
-        return
-    try:
-        import resend
-        resend.api_key = settings.resend_api_key
-        resend.Emails.send({
-            "from": "FinZen <onboarding@resend.dev>",
-            "to": email,
-            "subject": "Verifica tu cuenta en FinZen",
-            "html": f"""
+    return "Verifica tu cuenta en FinZen", f"""
             <div style="font-family:sans-serif;max-width:480px;margin:0 auto;padding:32px 24px;">
               <h2 style="color:#4f46e5;margin-bottom:8px;">Bienvenido a FinZen</h2>
               <p style="color:#374151;">Haz clic en el botón para verificar tu dirección de email:</p>
@@ -29,26 +24,12 @@ def send_verification_email(email: str, token: str) -> None:
                 El enlace expira en 24 horas.
               </p>
             </div>
-            """,
-        })
-    except Exception as e:
-        logger.error(f"Error sending verification email to {email}: {e}")
-        raise
+            """
 
 
-def send_reset_email(email: str, token: str) -> None:
+def render_reset_email(token: str) -> tuple[str, str]:
     url = f"{settings.frontend_url}/restablecer-contrasena?token={token}"
-    if not settings.resend_api_key:
-        print(f"[DEV] Password reset link for {email}: {url}", flush=True)
-        return
-    try:
-        import resend
-        resend.api_key = settings.resend_api_key
-        resend.Emails.send({
-            "from": "FinZen <onboarding@resend.dev>",
-            "to": email,
-            "subject": "Restablece tu contraseña en FinZen",
-            "html": f"""
+    return "Restablece tu contraseña en FinZen", f"""
             <div style="font-family:sans-serif;max-width:480px;margin:0 auto;padding:32px 24px;">
               <h2 style="color:#4f46e5;margin-bottom:8px;">Restablecer contraseña</h2>
               <p style="color:#374151;">Recibimos una solicitud para restablecer tu contraseña.</p>
@@ -61,8 +42,56 @@ def send_reset_email(email: str, token: str) -> None:
                 El enlace expira en 1 hora.
               </p>
             </div>
-            """,
-        })
-    except Exception as e:
-        logger.error(f"Error sending reset email to {email}: {e}")
-        raise
+            """
+
+
+class ResendTransport:
+    def __init__(self, api_key: str):
+        import resend
+        resend.api_key = api_key
+        self._resend = resend
+
+    def send(self, to: str, subject: str, html: str) -> None:
+        self._resend.Emails.send({"from": EMAIL_FROM, "to": to, "subject": subject, "html": html})
+
+
+class ConsoleTransport:
+    """Desarrollo: imprime el email en la salida estándar en lugar de enviarlo."""
+
+    def send(self, to: str, subject: str, html: str) -> None:
+        print(f"[DEV] Email to {to}: {subject}\n{html}", flush=True)
+
+
+class FileTransport:
+    """Pruebas: agrega cada email como una línea JSON al archivo configurado."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def send(self, to: str, subject: str, html: str) -> None:
+        record = {"to": to, "subject": subject, "html": html, "sent_at": datetime.utcnow().isoformat()}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def email_transport_name() -> str:
+    """Transporte configurado; sin EMAIL_TRANSPORT se usa Resend si hay API key, si no la consola."""
+    if settings.email_transport:
+        return settings.email_transport
+    return "resend" if settings.resend_api_key else "console"
+
+
+def email_delivery_enabled() -> bool:
+    """Con el transporte de consola no se exige verificar el email (nadie recibe el enlace)."""
+    return email_transport_name() != "console"
+
+
+def get_transport():
+    name = email_transport_name()
+    if name == "resend":
+        return ResendTransport(settings.resend_api_key)
+    if name == "file":
+        return FileTransport(settings.email_file_path)
+    if name == "console":
+        return ConsoleTransport()
+    raise ValueError(f"Unknown email transport: {name}")
@@ -0,0 +1,61 @@
+"""ETag de los listados a partir de un contador de versión por usuario y recurso.
+
+Cada escritura que cambia lo que devuelve un listado ejecuta `version_bump` en su misma
+transacción. El listado lee primero la versión (una fila por clave primaria) y, si
+coincide con el If-None-Match del cliente, responde 304 sin consultar los datos.
+
+Si una escritura entra entre la lectura de la versión y la del listado, el ETag enviado
+queda viejo respecto del cuerpo: el cliente solo pierde un 304 en la próxima petición,
+nunca recibe datos viejos.
+"""
+from fastapi import Request, Response
+from sqlalchemy import Insert, Select, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.resource_version import ResourceVersion
+
+
+def version_bump(user_id: int, *resources: str) -> Insert:
+    """Incrementa la versión de los recursos del usuario (en orden, para no cruzar locks)."""
+    stmt = insert(ResourceVersion).values([
+        {"user_id": user_id, "resource": resource, "version": 1} for resource in sorted(set(resources))
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=[ResourceVersion.user_id, ResourceVersion.resource],
+        set_={"version": ResourceVersion.version + 1},
+    )
+
+
+def version_select(user_id: int, resource: str) -> Select:
+    """Versión actual del recurso; 0 si nunca se escribió."""
+    return select(func.coalesce(func.max(ResourceVersion.version), 0)).where(
+        ResourceVersion.user_id == user_id, ResourceVersion.resource == resource
+    )
+
+
+def _matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match compara en forma débil: W/"x" equivale a "x"
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def conditional_response(
+    request: Request, response: Response, user_id: int, resource: str, version: int | str,
+) -> Response | None:
+    """304 si el cliente ya tiene esta versión; si no, agrega los headers de cache y devuelve None.
+
+    El ETag incluye al usuario: el cache del navegador es por URL, y tras un cambio de
+    sesión otra cuenta no debe validar el cuerpo cacheado de la anterior.
+    """
+    headers = {
+        "ETag": f'"{resource}-{user_id}-{version}"',
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization",
+    }
+    if _matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,203 @@
+"""Parsers incrementales de extractos bancarios (CSV y OFX).
+
+Leen el archivo por partes y emiten `(número de fila, dict)` con las claves de
+`TransactionCreate` (o solo `ROW_ERROR` si la fila ya es inválida al parsearla); la
+validación la hace quien consume el generador. Nunca cargan el archivo completo en memoria.
+"""
+import codecs
+import csv
+import io
+import re
+from typing import BinaryIO, Iterator
+
+OFX_CHUNK_SIZE = 64 * 1024
+# Clave de una fila que el parser ya rechazó; su valor es el mensaje de error
+ROW_ERROR = "_error"
+
+# Encabezados aceptados en el CSV (en minúsculas) → campo de TransactionCreate
+CSV_COLUMNS = {
+    "account_id": "account_id",
+    "cuenta": "account_id",
+    "category_id": "category_id",
+    "categoria": "category_id",
+    "categoría": "category_id",
+    "type": "type",
+    "tipo": "type",
+    "amount": "amount",
+    "monto": "amount",
+    "valor": "amount",
+    "date": "date",
+    "fecha": "date",
+    "description": "description",
+    "descripcion": "description",
+    "descripción": "description",
+}
+
+
+class ImportFormatError(ValueError):
+    """El archivo no tiene un formato reconocible (encabezado inválido, OFX sin movimientos...)."""
+
+
+def _grouped(digits: str, separator: str) -> bool:
+    """Parte entera agrupada de a tres cifras con `separator` ("1.234.567")."""
+    return re.fullmatch(rf"\d{{1,3}}(?:{re.escape(separator)}\d{{3}})*", digits) is not None
+
+
+def _normalize_amount(value: str) -> str:
+    """Monto con separadores de miles y de decimales en cualquiera de las dos convenciones.
+
+    Con punto y coma a la vez, el último es el decimal ("1.234,56", "1,234.56"). Un separador
+    repetido, o uno solo seguido de exactamente tres cifras, es de miles: "50.000" son
+    cincuenta mil (COP) y "1,234" es 1234. Con una o dos cifras detrás es decimal ("12,5").
+    Lanza ValueError si el monto está mal agrupado en lugar de adivinar.
+    """
+    value = value.strip().replace(" ", "").replace("$", "")
+    sign = ""
+    if value.startswith(("-", "+")):
+        sign, value = value[0].replace("+", ""), value[1:]
+    separators = [c for c in value if c in ".,"]
+    if not separators:
+        return sign + value
+    last = max(value.rfind("."), value.rfind(","))
+    integer, decimals = value[:last], value[last + 1:]
+    if len(set(separators)) == 2:
+        thousands = "," if value[last] == "." else "."
+        if value[last] in integer or not decimals.isdigit() or not _grouped(integer, thousands):
+            raise ValueError(f"Monto ambiguo o mal agrupado: {value}")
+        return f"{sign}{integer.replace(thousands, '')}.{decimals}"
+    separator = separators[0]
+    if len(separators) > 1:
+        if not _grouped(value, separator):
+            raise ValueError(f"Monto ambiguo o mal agrupado: {value}")
+        return sign + value.replace(separator, "")
+    if not (integer.isdigit() or integer == "" and len(decimals) != 3) or not decimals.isdigit():
+        raise ValueError(f"Monto ambiguo o mal agrupado: {value}")
+    if len(decimals) == 3 and _grouped(value, separator) and integer.strip("0"):
+        return sign + integer + decimals
+    return f"{sign}{integer}.{decimals}"
+
+
+def _signed_row(row: dict) -> dict:
+    """Sin columna de tipo, el signo del monto decide: negativo = gasto, positivo = ingreso."""
+    if not row.get("type") and row.get("amount"):
+        amount = float(row["amount"])
+        row["type"] = "expense" if amount < 0 else "income"
+        row["amount"] = str(abs(amount))
+    return row
+
+
+def _csv_encoding(file: BinaryIO) -> str:
+    """UTF-8 si todo el archivo lo es; si no, Windows-1252 (exportaciones de Excel y bancos).
+
+    Recorre el archivo por partes con un decoder incremental y lo deja al inicio.
+    """
+    if not file.seekable():
+        return "utf-8-sig"
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        while chunk := file.read(OFX_CHUNK_SIZE):
+            decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+        return "utf-8-sig"
+    except UnicodeDecodeError:
+        return "cp1252"
+    finally:
+        file.seek(0)
+
+
+def parse_csv(file: BinaryIO, default_account_id: int | None = None) -> Iterator[tuple[int, dict]]:
+    # cp1252 deja sin definir cinco bytes: se reemplazan en lugar de abortar la importación
+    text = io.TextIOWrapper(file, encoding=_csv_encoding(file), errors="replace", newline="")
+    try:
+        yield from _parse_csv_text(text, default_account_id)
+    except csv.Error as e:
+        raise ImportFormatError(f"CSV mal formado: {e}")
+
+
+def _parse_csv_text(text: io.TextIOWrapper, default_account_id: int | None) -> Iterator[tuple[int, dict]]:
+    header_line = text.readline()
+    if not header_line.strip():
+        raise ImportFormatError("El archivo está vacío")
+    delimiter = ";" if header_line.count(";") > header_line.count(",") else ","
+    header = next(csv.reader([header_line], delimiter=delimiter))
+    fields = [CSV_COLUMNS.get(h.strip().lower()) for h in header]
+    if "amount" not in fields or "date" not in fields:
+        raise ImportFormatError("El CSV debe tener columnas de fecha (date) y monto (amount)")
+
+    for line_no, values in enumerate(csv.reader(text, delimiter=delimiter), start=2):
+        if not any(v.strip() for v in values):
+            continue
+        row = {f: v.strip() for f, v in zip(fields, values) if f and v.strip()}
+        if "account_id" not in row and default_account_id is not None:
+            row["account_id"] = default_account_id
+        if "amount" in row:
+            try:
+                row["amount"] = _normalize_amount(row["amount"])
+            except ValueError as e:
+                yield line_no, {ROW_ERROR: str(e)}
+                continue
+        try:
+            row = _signed_row(row)
+        except ValueError:
+            pass  # el monto inválido lo reporta la validación
+        yield line_no, row
+
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+
+
+def _ofx_date(value: str) -> str:
+    # DTPOSTED: YYYYMMDD[HHMMSS[.XXX]][TZ]
+    return f"{value[0:4]}-{value[4:6]}-{value[6:8]}"
+
+
+def parse_ofx(file: BinaryIO, default_account_id: int | None = None) -> Iterator[tuple[int, dict]]:
+    """Movimientos <STMTTRN> de un OFX 1.x (SGML, sin tags de cierre) o 2.x (XML)."""
+    text = io.TextIOWrapper(file, encoding="latin-1", newline="")
+    buffer = ""
+    current: dict | None = None
+    index = 0
+    found = False
+    while True:
+        chunk = text.read(OFX_CHUNK_SIZE)
+        buffer += chunk
+        # Procesar hasta el último '<': lo que sigue puede ser un tag cortado entre lecturas
+        cut = len(buffer) if not chunk else buffer.rfind("<")
+        if cut <= 0 and chunk:
+            continue
+        for closing, tag, value in _OFX_TAG.findall(buffer[:cut]):
+            tag = tag.upper()
+            value = value.strip()
+            if tag == "STMTTRN":
+                if closing or current is not None:
+                    if current is not None:
+                        index += 1
+                        yield index, _ofx_row(current, default_account_id)
+                    current = None
+                if not closing:
+                    current = {}
+                    found = True
+            elif current is not None and not closing and value:
+                current[tag] = value
+        buffer = buffer[cut:]
+        if not chunk:
+            break
+    if current is not None:
+        index += 1
+        yield index, _ofx_row(current, default_account_id)
+    if not found:
+        raise ImportFormatError("El archivo OFX no contiene movimientos (STMTTRN)")
+
+
+def _ofx_row(trn: dict, default_account_id: int | None) -> dict:
+    row = {
+        "description": trn.get("NAME") or trn.get("MEMO") or "",
+        "amount": trn.get("TRNAMT", "").replace(",", "."),
+        "date": _ofx_date(trn["DTPOSTED"]) if trn.get("DTPOSTED") else None,
+    }
+    if default_account_id is not None:
+        row["account_id"] = default_account_id
+    try:
+        return _signed_row(row)
+    except ValueError:
+        return row
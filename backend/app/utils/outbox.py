@@ -0,0 +1,109 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal
+from app.models.email_outbox import EmailKind, EmailOutbox, OutboxStatus
+from app.utils.email import get_transport, render_reset_email, render_verification_email
+
+logger = logging.getLogger(__name__)
+
+_RENDERERS = {
+    EmailKind.verification: render_verification_email,
+    EmailKind.password_reset: render_reset_email,
+}
+
+# La request solo inserta la fila (en su misma transacción); el envío lo hace este
+# worker. Las filas se reclaman con FOR UPDATE SKIP LOCKED, así que varias instancias
+# de la app pueden procesar la cola sin enviar el mismo email dos veces.
+_worker: threading.Thread | None = None
+_worker_lock = threading.Lock()
+_wake = threading.Event()
+_stopping = threading.Event()
+
+
+def enqueue_email(db: Session, kind: EmailKind, to_email: str, token: str) -> None:
+    """Agrega el email a la sesión; se persiste con el commit de quien llama."""
+    db.add(EmailOutbox(kind=kind, to_email=to_email, token=token))
+
+
+def wake_outbox_worker() -> None:
+    """Pide al worker que revise la cola ya (llamar después del commit)."""
+    _wake.set()
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=settings.email_outbox_backoff_seconds * 2 ** (attempts - 1))
+
+
+def deliver_pending(transport=None) -> int:
+    """Envía un lote de emails pendientes; devuelve cuántos se procesaron."""
+    transport = transport or get_transport()
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        rows = db.scalars(
+            select(EmailOutbox)
+            .where(EmailOutbox.status == OutboxStatus.pending, EmailOutbox.next_attempt_at <= now)
+            .order_by(EmailOutbox.next_attempt_at)
+            .limit(settings.email_outbox_batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        for row in rows:
+            row.attempts += 1
+            try:
+                subject, html = _RENDERERS[row.kind](row.token)
+                transport.send(row.to_email, subject, html)
+            except Exception as e:
+                logger.error(f"Error sending {row.kind.value} email to {row.to_email} (attempt {row.attempts}): {e}")
+                row.last_error = str(e)[:500]
+                if row.attempts >= settings.email_outbox_max_attempts:
+                    row.status = OutboxStatus.failed
+                else:
+                    row.next_attempt_at = datetime.utcnow() + _backoff(row.attempts)
+            else:
+                row.status = OutboxStatus.sent
+                row.sent_at = datetime.utcnow()
+                row.last_error = None
+        db.commit()
+        return len(rows)
+
+
+def _run_worker() -> None:
+    transport = None
+    while not _stopping.is_set():
+        _wake.clear()
+        try:
+            # Dentro del try: un transporte mal configurado se reintenta en cada ciclo en
+            # vez de matar el thread y dejar la cola pendiente para siempre
+            transport = transport or get_transport()
+            # Lote lleno: puede haber más pendientes, seguir sin esperar
+            if deliver_pending(transport) >= settings.email_outbox_batch_size:
+                continue
+        except Exception as e:
+            logger.error(f"Email outbox worker error: {e}")
+        _wake.wait(settings.email_outbox_poll_seconds)
+
+
+def start_outbox_worker() -> None:
+    global _worker
+    with _worker_lock:
+        if _worker is not None or not settings.email_outbox_worker_enabled:
+            return
+        _stopping.clear()
+        _worker = threading.Thread(target=_run_worker, name="email-outbox", daemon=True)
+        _worker.start()
+
+
+def stop_outbox_worker(timeout: float = 5.0) -> None:
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            return
+        _stopping.set()
+        _wake.set()
+        _worker.join(timeout)
+        _worker = None
@@ -0,0 +1,62 @@
+import asyncio
+import functools
+import inspect
+import random
+import time
+
+from sqlalchemy.exc import DBAPIError
+
+from app.config import settings
+from app.database import Base
+
+# serialization_failure y deadlock_detected: la transacción se puede reintentar completa
+RETRYABLE_SQLSTATES = {"40001", "40P01"}
+
+
+def is_retryable(exc: DBAPIError) -> bool:
+    orig = exc.orig
+    return (getattr(orig, "pgcode", None) or getattr(orig, "sqlstate", None)) in RETRYABLE_SQLSTATES
+
+
+def _backoff(attempt: int) -> float:
+    return 0.01 * 2 ** attempt * (1 + random.random())
+
+
+def retry_on_conflict(fn):
+    """Reintenta el endpoint completo si Postgres aborta la transacción por conflicto.
+
+    El endpoint debe recibir la sesión como `db`. Antes de reintentar se hace rollback;
+    en async se recargan las entidades inyectadas (p. ej. current_user), porque el
+    rollback las expira y no se pueden cargar de forma implícita.
+    """
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            db = kwargs["db"]
+            for attempt in range(settings.db_write_retries + 1):
+                try:
+                    return await fn(*args, **kwargs)
+                except DBAPIError as e:
+                    if attempt == settings.db_write_retries or not is_retryable(e):
+                        raise
+                    await db.rollback()
+                    for value in kwargs.values():
+                        if isinstance(value, Base) and value in db:
+                            await db.refresh(value)
+                    await asyncio.sleep(_backoff(attempt))
+
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        db = kwargs["db"]
+        for attempt in range(settings.db_write_retries + 1):
+            try:
+                return fn(*args, **kwargs)
+            except DBAPIError as e:
+                if attempt == settings.db_write_retries or not is_retryable(e):
+                    raise
+                db.rollback()
+                time.sleep(_backoff(attempt))
+
+    return wrapper
@@ -0,0 +1,181 @@
+"""Serialización rápida de respuestas y negociación de formato y compresión.
+
+- `FastJSONResponse` es la response class por defecto de la app: vuelca con orjson si está
+  instalado (json de la stdlib si no).
+- `encoded_response` saltea el camino por defecto de FastAPI en los listados grandes
+  (validar → dicts de Python → json.dumps): valida con un TypeAdapter y pydantic-core
+  vuelca directo a bytes, o, si las filas ya vienen como columnas de la base con los campos
+  del schema, las vuelca con orjson sin validar. Con `Accept: application/msgpack` responde
+  MessagePack si msgpack está instalado.
+- `CompressionMiddleware` comprime con brotli (si está instalado) o gzip, según
+  Accept-Encoding, las respuestas completas de al menos `compression_min_bytes`. Las
+  respuestas en streaming (NDJSON, exportaciones) pasan sin tocar.
+"""
+import gzip
+from datetime import date
+from enum import Enum
+from functools import lru_cache
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+COMPRESSIBLE_TYPES = ("application/json", MSGPACK_MEDIA_TYPE, "application/x-ndjson", "text/")
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def _orjson_default(obj: Any) -> Any:
+    # orjson no acepta subclases de float (np.float64 que llega sin pasar por un schema)
+    if isinstance(obj, float):
+        return float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+@lru_cache(maxsize=None)
+def _adapter(tp: Any) -> TypeAdapter:
+    return TypeAdapter(tp)
+
+
+def wants_msgpack(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return msgpack is not None and (MSGPACK_MEDIA_TYPE in accept or "application/x-msgpack" in accept)
+
+
+def _msgpack_default(obj: Any) -> Any:
+    # Mismas representaciones que el JSON de orjson
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    raise TypeError(f"Type is not MessagePack serializable: {type(obj).__name__}")
+
+
+def encoded_response(request: Request, response: Response, tp: Any, content: Any, *, trusted: bool = False) -> Response:
+    """Valida `content` contra `tp` (el mismo response_model) y lo devuelve ya serializado.
+
+    Con `trusted`, `content` es una lista de dicts con exactamente los campos de `tp` leídos
+    de la base (tipos ya compatibles) y se serializa sin validar. Conserva los headers que
+    el handler puso en `response` (cursor, ETag).
+    """
+    msgpack_requested = wants_msgpack(request)
+    if trusted and msgpack_requested:
+        result = Response(msgpack.packb(content, default=_msgpack_default), media_type=MSGPACK_MEDIA_TYPE)
+    elif trusted and orjson is not None:
+        result = Response(orjson.dumps(content, default=_orjson_default), media_type="application/json")
+    else:
+        adapter = _adapter(tp)
+        value = adapter.validate_python(content)
+        if msgpack_requested:
+            result = Response(msgpack.packb(adapter.dump_python(value, mode="json")), media_type=MSGPACK_MEDIA_TYPE)
+        else:
+            result = Response(adapter.dump_json(value), media_type="application/json")
+    result.headers.raw.extend(response.headers.raw)
+    result.headers.add_vary_header("Accept")
+    return result
+
+
+def _choose_encoding(accept_encoding: str) -> str | None:
+    accepted = set()
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.partition(";")
+        q = params.replace(" ", "").removeprefix("q=")
+        try:
+            if params and float(q) == 0:
+                continue
+        except ValueError:
+            pass
+        accepted.add(name.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """Middleware ASGI de compresión; debe quedar por dentro de los BaseHTTPMiddleware.
+
+    Solo comprime respuestas que llegan en un único mensaje de cuerpo: un BaseHTTPMiddleware
+    por dentro las convertiría en streaming y pasarían sin comprimir.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Message | None = None
+
+        async def compressing_send(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None:
+                # Resto de un streaming: el inicio ya salió sin comprimir
+                await send(message)
+                return
+            response_start, start = start, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=response_start["headers"])
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(response_start)
+                await send(message)
+                return
+            body = await run_in_threadpool(_compress, body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            # Otra codificación, otros bytes: el ETag fuerte pasa a débil
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = f"W/{etag}"
+            await send(response_start)
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, compressing_send)
@@ -0,0 +1,133 @@
+"""Comparación de carga: handler sync (threadpool + Session) vs. async (AsyncSession).
+
+Monta dos endpoints gemelos que hacen lo mismo que GET /accounts (más una latencia de
+red simulada con pg_sleep) y los golpea en proceso con N clientes concurrentes.
+
+    cd backend && python -m benchmarks.async_vs_sync --requests 1000 --concurrency 10 30 100
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+import app.models  # noqa: F401 - registrar todos los modelos
+from app.database import SessionLocal
+from app.deps import get_async_db, get_db
+from app.models.account import Account, AccountSubtype, AccountType
+from app.models.user import User
+from app.schemas.account import AccountOut
+
+
+def build_app(user_id: int, latency: float) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/sync", response_model=list[AccountOut])
+    def sync_accounts(db: Session = Depends(get_db)):
+        db.execute(text("SELECT pg_sleep(:s)"), {"s": latency})
+        return db.query(Account).filter(Account.user_id == user_id).all()
+
+    @app.get("/async", response_model=list[AccountOut])
+    async def async_accounts(db: AsyncSession = Depends(get_async_db)):
+        await db.execute(text("SELECT pg_sleep(:s)"), {"s": latency})
+        return (await db.scalars(select(Account).where(Account.user_id == user_id))).all()
+
+    return app
+
+
+async def run(app: FastAPI, path: str, total: int, concurrency: int, timeout: float) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                r = await asyncio.wait_for(client.get(path), timeout)
+                r.raise_for_status()
+            except Exception:
+                # Timeout del pool, request cancelada por wait_for, 5xx...
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else float("nan"),
+        "p95_ms": latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000 if latencies else float("nan"),
+        "errors": errors,
+    }
+
+
+def seed() -> int:
+    db = SessionLocal()
+    user = User(email=f"bench-{uuid.uuid4().hex[:8]}@example.com", password_hash="", name="bench")
+    db.add(user)
+    db.flush()
+    for i in range(5):
+        db.add(Account(
+            user_id=user.id, name=f"Cuenta {i}", type=AccountType.debit,
+            account_subtype=AccountSubtype.cash, balance=100.0 * i,
+        ))
+    db.commit()
+    user_id = user.id
+    db.close()
+    return user_id
+
+
+def cleanup(user_id: int) -> None:
+    db = SessionLocal()
+    db.query(Account).filter(Account.user_id == user_id).delete()
+    db.query(User).filter(User.id == user_id).delete()
+    db.commit()
+    db.close()
+
+
+async def compare(app: FastAPI, total: int, levels: list[int], timeout: float) -> None:
+    # Un solo event loop: las conexiones de asyncpg quedan ligadas al loop que las abrió
+    print(f"{'path':<7} {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+    for concurrency in levels:
+        for path in ("/sync", "/async"):
+            r = await run(app, path, total, concurrency, timeout)
+            print(
+                f"{path:<7} {concurrency:>5} {r['rps']:>9.0f} {r['p50_ms']:>9.1f}"
+                f" {r['p95_ms']:>9.1f} {r['errors']:>7}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 30, 100])
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="latencia de red simulada por request")
+    parser.add_argument("--timeout", type=float, default=10.0, help="segundos antes de contar la request como error")
+    args = parser.parse_args()
+
+    user_id = seed()
+    try:
+        app = build_app(user_id, args.latency_ms / 1000)
+        asyncio.run(compare(app, args.requests, args.concurrency, args.timeout))
+    finally:
+        cleanup(user_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Contención sobre una sola cuenta: UPDATE atómico vs. leer-modificar-escribir.
+
+Lanza N hilos que registran ingresos sobre la misma cuenta, cada uno con su propia sesión
+y una transacción por operación. "naive" lee el saldo, lo suma en Python y lo escribe
+(como hacía `_apply_balance`); "atomic" usa `balance_update`. Al final compara el saldo
+esperado con el real: la diferencia son actualizaciones perdidas.
+
+    cd backend && python -m benchmarks.balance_contention --ops 200 --workers 4 16 64
+"""
+import argparse
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import select, update
+
+import app.models  # noqa: F401 - registrar todos los modelos
+from app.database import SessionLocal
+from app.models.account import Account, AccountSubtype, AccountType
+from app.models.transaction import TransactionType
+from app.models.user import User
+from app.services.balances import balance_update
+
+
+def naive(account_id: int, amount: float) -> None:
+    with SessionLocal() as db:
+        balance = db.scalar(select(Account.balance).where(Account.id == account_id))
+        db.execute(update(Account).where(Account.id == account_id).values(balance=balance + amount))
+        db.commit()
+
+
+def atomic(account_id: int, amount: float) -> None:
+    with SessionLocal() as db:
+        db.execute(balance_update(account_id, TransactionType.income, amount))
+        db.commit()
+
+
+def run(mode, account_id: int, ops: int, workers: int) -> dict:
+    with SessionLocal() as db:
+        db.execute(update(Account).where(Account.id == account_id).values(balance=0))
+        db.commit()
+
+    def worker(_):
+        for _ in range(ops):
+            mode(account_id, 1.0)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(worker, range(workers)))
+    elapsed = time.perf_counter() - started
+
+    with SessionLocal() as db:
+        final = db.scalar(select(Account.balance).where(Account.id == account_id))
+    expected = ops * workers
+    return {"ops_s": expected / elapsed, "expected": expected, "lost": expected - final}
+
+
+def seed() -> tuple[int, int]:
+    db = SessionLocal()
+    user = User(email=f"bench-{uuid.uuid4().hex[:8]}@example.com", password_hash="", name="bench")
+    db.add(user)
+    db.flush()
+    account = Account(
+        user_id=user.id, name="Cuenta", type=AccountType.debit,
+        account_subtype=AccountSubtype.cash, balance=0.0,
+    )
+    db.add(account)
+    db.commit()
+    ids = user.id, account.id
+    db.close()
+    return ids
+
+
+def cleanup(user_id: int) -> None:
+    db = SessionLocal()
+    db.query(Account).filter(Account.user_id == user_id).delete()
+    db.query(User).filter(User.id == user_id).delete()
+    db.commit()
+    db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ops", type=int, default=200, help="operaciones por hilo")
+    parser.add_argument("--workers", type=int, nargs="+", default=[4, 16, 64])
+    args = parser.parse_args()
+
+    user_id, account_id = seed()
+    try:
+        # Más hilos que el pool de conexiones hace esperar al pool, no a la fila: súbelo con
+        # DB_POOL_SIZE / DB_MAX_OVERFLOW para medir solo la contención en Postgres
+        print(f"{'mode':<7} {'workers':>7} {'ops/s':>9} {'expected':>9} {'lost':>7}")
+        for workers in args.workers:
+            for name, mode in (("naive", naive), ("atomic", atomic)):
+                r = run(mode, account_id, args.ops, workers)
+                print(f"{name:<7} {workers:>7} {r['ops_s']:>9.0f} {r['expected']:>9} {r['lost']:>7.0f}")
+    finally:
+        cleanup(user_id)
+
+
+if __name__ == "__main__":
+    main()
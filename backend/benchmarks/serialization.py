@@ -0,0 +1,118 @@
+"""Serialización de un listado de transacciones: camino por defecto de FastAPI vs. encoded_response.
+
+Monta endpoints gemelos que devuelven las mismas N transacciones ya cargadas en memoria
+(sin base de datos, para medir solo la serialización) y los golpea en proceso:
+
+- before: response_model + JSONResponse (validar → dicts → json.dumps);
+- after-orm: encoded_response sobre entidades (TypeAdapter → bytes);
+- after: encoded_response sobre columnas, como el listado (orjson sin validar), en JSON y
+  en MessagePack si está instalado;
+- before+gzip / after+gzip / after+br: lo mismo detrás de CompressionMiddleware.
+
+    cd backend && python -m benchmarks.serialization --rows 10000 --requests 30
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+import httpx
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
+
+import app.models  # noqa: F401 - registrar todos los modelos
+from app.models.transaction import Transaction, TransactionType
+from app.schemas.transaction import TransactionOut
+from app.utils import serialization
+from app.utils.serialization import CompressionMiddleware, MSGPACK_MEDIA_TYPE, encoded_response
+
+
+def build_rows(n: int) -> list[Transaction]:
+    start = date(2026, 1, 1)
+    created = datetime(2026, 1, 1, 12, 0, 0)
+    return [
+        Transaction(
+            id=i, user_id=1, account_id=1 + i % 5, category_id=1 + i % 20 if i % 7 else None,
+            type=TransactionType.expense if i % 3 else TransactionType.income,
+            amount=round(1000 + i * 3.17, 2), date=start + timedelta(days=i % 365),
+            description=f"Movimiento {i}", transfer_pair_id=None, created_at=created + timedelta(seconds=i),
+        )
+        for i in range(n)
+    ]
+
+
+def build_app(rows: list[Transaction], compress: bool) -> FastAPI:
+    app = FastAPI(default_response_class=JSONResponse)
+    if compress:
+        app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/before", response_model=list[TransactionOut])
+    async def before():
+        return rows
+
+    @app.get("/after-orm", response_model=list[TransactionOut])
+    async def after_orm(request: Request, response: Response):
+        return encoded_response(request, response, list[TransactionOut], rows)
+
+    # Lo que devuelve un select de columnas; el armado de los dicts (Row._asdict) entra en la medición
+    names = list(TransactionOut.model_fields)
+    columns = [tuple(getattr(tx, name) for name in names) for tx in rows]
+
+    @app.get("/after", response_model=list[TransactionOut])
+    async def after(request: Request, response: Response):
+        content = [dict(zip(names, row)) for row in columns]
+        return encoded_response(request, response, list[TransactionOut], content, trusted=True)
+
+    return app
+
+
+async def run(app: FastAPI, path: str, total: int, headers: dict) -> dict:
+    latencies: list[float] = []
+    size = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(total):
+            start = time.perf_counter()
+            r = await client.get(path, headers=headers)
+            r.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+            size = r.num_bytes_downloaded
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[max(int(len(latencies) * 0.95) - 1, 0)] * 1000,
+        "bytes": size,
+    }
+
+
+async def compare(rows: list[Transaction], total: int) -> None:
+    plain, compressed = build_app(rows, compress=False), build_app(rows, compress=True)
+    cases = [
+        ("before", plain, "/before", {}),
+        ("after-orm", plain, "/after-orm", {}),
+        ("after", plain, "/after", {}),
+    ]
+    if serialization.msgpack is not None:
+        cases.append(("after msgpack", plain, "/after", {"Accept": MSGPACK_MEDIA_TYPE}))
+    cases.append(("before+gzip", compressed, "/before", {"Accept-Encoding": "gzip"}))
+    cases.append(("after+gzip", compressed, "/after", {"Accept-Encoding": "gzip"}))
+    if serialization.brotli is not None:
+        cases.append(("after+br", compressed, "/after", {"Accept-Encoding": "br"}))
+
+    print(f"{'case':<15} {'p50 ms':>9} {'p95 ms':>9} {'bytes':>11}")
+    for name, app, path, headers in cases:
+        r = await run(app, path, total, headers)
+        print(f"{name:<15} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['bytes']:>11}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(compare(build_rows(args.rows), args.requests))
+
+
+if __name__ == "__main__":
+    main()
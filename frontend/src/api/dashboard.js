@@ -2,4 +2,5 @@ import api from "./axios";
 
 export const dashboardApi = {
   summary: () => api.get("/dashboard/summary").then((r) => r.data),
+  forecast: (days = 90) => api.get("/forecast", { params: { days } }).then((r) => r.data),
 };
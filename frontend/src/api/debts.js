@@ -6,4 +6,7 @@ export const debtsApi = {
   update: (id, data) => api.put(`/debts/${id}`, data).then((r) => r.data),
   delete: (id) => api.delete(`/debts/${id}`),
   addPayment: (id, data) => api.post(`/debts/${id}/payments`, data).then((r) => r.data),
+  schedules: () => api.get("/debts/schedules").then((r) => r.data),
+  schedule: (id) => api.get(`/debts/${id}/schedule`).then((r) => r.data),
+  strategy: (data) => api.post("/debts/strategy", data).then((r) => r.data),
 };
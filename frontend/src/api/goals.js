@@ -6,5 +6,10 @@ export const goalsApi = {
   update: (id, data) => api.put(`/goals/${id}`, data).then((r) => r.data),
   delete: (id) => api.delete(`/goals/${id}`),
   addContribution: (id, data) => api.post(`/goals/${id}/contributions`, data).then((r) => r.data),
+  contributions: (id, params) =>
+    api.get(`/goals/${id}/contributions`, { params }).then((r) => ({
+      items: r.data,
+      nextCursor: r.headers["x-next-cursor"] || null,
+    })),
   markAsAchieved: (id) => api.post(`/goals/${id}/achieve`).then((r) => r.data),
 };
@@ -0,0 +1,5 @@
+import api from "./axios";
+
+export const statsApi = {
+  year: (year) => api.get(`/stats/${year}`).then((r) => r.data),
+};
@@ -2,8 +2,21 @@ import api from "./axios";
 
 export const transactionsApi = {
   list: (params) => api.get("/transactions", { params }).then((r) => r.data),
+  page: (params) =>
+    api.get("/transactions", { params }).then((r) => ({
+      items: r.data,
+      nextCursor: r.headers["x-next-cursor"] || null,
+    })),
   create: (data) => api.post("/transactions", data).then((r) => r.data),
   update: (id, data) => api.put(`/transactions/${id}`, data).then((r) => r.data),
   delete: (id) => api.delete(`/transactions/${id}`),
   transfer: (data) => api.post("/transactions/transfer", data).then((r) => r.data),
+  export: (params) =>
+    api.get("/transactions/export", { params, responseType: "blob" }).then((r) => r.data),
+  import: (file, accountId) => {
+    const form = new FormData();
+    form.append("file", file);
+    if (accountId) form.append("account_id", accountId);
+    return api.post("/transactions/import", form).then((r) => r.data);
+  },
 };
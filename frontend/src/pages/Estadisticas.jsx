@@ -1,7 +1,6 @@
 import { useState, useEffect } from "react";
 import { useTranslation } from "react-i18next";
-import { transactionsApi } from "../api/transactions";
-import { categoriesApi } from "../api/categories";
+import { statsApi } from "../api/stats";
 import { useCurrency } from "../hooks/useCurrency";
 import {
   PieChart, Pie, Cell, Tooltip, ResponsiveContainer,
@@ -21,45 +20,29 @@ function Card({ title, children }) {
 export default function Estadisticas() {
   const { t } = useTranslation();
   const formatAmount = useCurrency();
-  const [transactions, setTransactions] = useState([]);
-  const [categories, setCategories] = useState([]);
+  const [stats, setStats] = useState(null);
   const [year, setYear] = useState(new Date().getFullYear());
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    Promise.all([
-      transactionsApi.list({ from: `${year}-01-01`, to: `${year}-12-31` }),
-      categoriesApi.list(),
-    ]).then(([txs, cats]) => {
-      setTransactions(txs);
-      setCategories(cats);
-    }).finally(() => setLoading(false));
+    statsApi.year(year).then(setStats).finally(() => setLoading(false));
   }, [year]);
 
   const MONTHS = t("statistics.months", { returnObjects: true });
 
-  // By category (expenses only)
-  const expenseByCategory = {};
-  transactions
-    .filter((tx) => tx.type === "expense" && !tx.transfer_pair_id)
-    .forEach((tx) => {
-      const cat = categories.find((c) => c.id === tx.category_id);
-      const name = cat?.name || "Sin categoría";
-      const color = cat?.color || "#6B7280";
-      if (!expenseByCategory[name]) expenseByCategory[name] = { name, value: 0, color };
-      expenseByCategory[name].value += tx.amount;
-    });
-  const pieData = Object.values(expenseByCategory).sort((a, b) => b.value - a.value).slice(0, 8);
+  // By category (expenses only) — agregado en el servidor, ya ordenado de mayor a menor
+  const pieData = (stats?.expense_by_category || []).slice(0, 8).map((c) => ({
+    name: c.name || "Sin categoría",
+    value: c.total,
+    color: c.color || "#6B7280",
+  }));
 
   // Monthly income vs expense
-  const monthlyData = Array.from({ length: 12 }, (_, i) => ({ month: MONTHS[i], ingresos: 0, gastos: 0 }));
-  transactions
-    .filter((tx) => !tx.transfer_pair_id)
-    .forEach((tx) => {
-      const m = new Date(tx.date + "T00:00:00").getMonth();
-      if (tx.type === "income") monthlyData[m].ingresos += tx.amount;
-      else monthlyData[m].gastos += tx.amount;
-    });
+  const monthlyData = (stats?.monthly || []).map((m) => ({
+    month: MONTHS[m.month - 1],
+    ingresos: m.income,
+    gastos: m.expense,
+  }));
 
   // Balance line chart
   const lineData = monthlyData.map((d) => ({ ...d, balance: d.ingresos - d.gastos }));